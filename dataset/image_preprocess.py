@@ -8,6 +8,8 @@ import os
 import yaml
 import logging  # 新增
 import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from globals.globals import dataset_settings
 
 # 設定 logger
@@ -28,137 +30,185 @@ logger = logging.getLogger(__name__)
 
 BASE_PATH = "dataset/coffee_bean_dataset_2/full_insect_damage"
 
+# 形態學開運算的 kernel，模組層級共用避免每張影像重新配置
+_OPEN_KERNEL = np.ones((3, 3), np.uint8)
+
 pixel_threshold_lower = dataset_settings['coffee_bean_pixel_threshold']['lower']  # 獲取像素下限
 pixel_threshold_upper = dataset_settings['coffee_bean_pixel_threshold']['upper']  # 獲取像素上限
 
+# 每個 (資料夾, 命名空間) 的下一個流水號快取，避免每次儲存都重新掃描資料夾
+_next_image_numbers = {}
+
+def _scan_latest_image_number(image_folder, namespace):
+    """只在第一次遇到該命名空間時掃描資料夾，找出目前最大的流水號"""
+    existing_images = glob.glob(os.path.join(image_folder, f'{namespace}_*.jpg'))
+    latest_image_number = 0
+    for image_path in existing_images:
+        try:
+            number = int(os.path.basename(image_path).split('_')[-1].split('.')[0])
+        except ValueError:
+            continue
+        if number > latest_image_number:
+            latest_image_number = number
+    return latest_image_number
+
 def save_image(image_folder, image, namespace):
     if not os.path.exists(image_folder):
-        os.makedirs(image_folder)
+        os.makedirs(image_folder, exist_ok=True)
         logger.info(f"建立資料夾: {image_folder}")
-    
-    # 找到images資料夾中最大的號碼
-    existing_images = glob.glob(os.path.join(image_folder, f'{namespace}_*.jpg'))
-    if existing_images:
-        latest_image = max(existing_images, key=os.path.getctime)
-        latest_image_number = int(os.path.basename(latest_image).split('_')[-1].split('.')[0])
-    else:
-        latest_image_number = 0
-    
+
+    # 以快取的流水號遞增，第一次才掃描資料夾
+    key = (image_folder, namespace)
+    if key not in _next_image_numbers:
+        _next_image_numbers[key] = _scan_latest_image_number(image_folder, namespace)
+    _next_image_numbers[key] += 1
+
     # 將圖像寫入到images資料夾中，命名是namespace_{i}.jpg
-    image_path = os.path.join(image_folder, f'{namespace}_{latest_image_number + 1}.jpg')
+    image_path = os.path.join(image_folder, f'{namespace}_{_next_image_numbers[key]}.jpg')
     cv2.imwrite(image_path, image)
     logger.info(f"儲存影像到 {image_path}")
 
-def process_coffee_beans(image, show_image=False, pixel_threshold_lower=10000, pixel_threshold_upper=50000):
+def process_coffee_beans(image, show_image=False, pixel_threshold_lower=10000, pixel_threshold_upper=50000, draw_boxes=True, out_buf=None):
     logger.info("開始處理影像：灰階轉換")
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     if show_image:
         cv2.imshow('灰度圖', gray)
         cv2.waitKey(0)
-    
+
+    # 後續步驟以兩個緩衝區交替寫入 (dst=)，避免每步重新配置整張影像
+    tmp = np.empty_like(gray)
+
     logger.info("進行高斯模糊降噪")
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0, dst=tmp)
     if show_image:
         cv2.imshow('高斯模糊', blurred)
         cv2.waitKey(0)
-    
+
     logger.info("進行Otsu二值化")
-    _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU, dst=gray)
     if show_image:
         cv2.imshow('二值化', binary)
         cv2.waitKey(0)
-    
+
     logger.info("進行形態學開運算去除雜訊")
-    kernel = np.ones((3,3), np.uint8)
-    opening = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel, iterations=2)
+    opening = cv2.morphologyEx(binary, cv2.MORPH_OPEN, _OPEN_KERNEL, dst=tmp, iterations=2)
     if show_image:
         cv2.imshow('開運算', opening)
         cv2.waitKey(0)
     
-    logger.info("尋找輪廓")
-    contours, _ = cv2.findContours(opening, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-    logger.info(f"總共找到 {len(contours)} 個輪廓")
-    result = image.copy()
-    
-    filtered_contours = [
-        contour for contour in contours 
-        if pixel_threshold_lower < cv2.contourArea(contour) < pixel_threshold_upper]
-    logger.info(f"經過面積篩選後剩下 {len(filtered_contours)} 個輪廓")
-        
+    logger.info("尋找連通元件")
+    num_labels, labels_map, stats, _ = cv2.connectedComponentsWithStats(opening, connectivity=8)
+    logger.info(f"總共找到 {num_labels - 1} 個連通元件")
+    # 繪圖輸出可關閉；需要時優先複用呼叫端提供的緩衝區，避免每張影像整幅重新配置
+    if not draw_boxes:
+        result = None
+    elif out_buf is not None and out_buf.shape == image.shape:
+        np.copyto(out_buf, image)
+        result = out_buf
+    else:
+        result = image.copy()
+
+    # 面積篩選用 stats 一次取得，以 NumPy 遮罩過濾（第0個元件是背景）
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    keep = np.flatnonzero(
+        (areas > pixel_threshold_lower) & (areas < pixel_threshold_upper)) + 1
+    logger.info(f"經過面積篩選後剩下 {len(keep)} 個連通元件")
+
     rotated_beans = []
     logger.info("開始旋轉每顆咖啡豆的邊界並記錄區域")
-    for idx, contour in enumerate(filtered_contours):
-        area = cv2.contourArea(contour)
-        if area > pixel_threshold_lower and area < pixel_threshold_upper:
-            # 1. 取得最小外接旋轉矩形
-            rect = cv2.minAreaRect(contour)
-            box = cv2.boxPoints(rect)
-            box = np.int32(box)
-            # === 新增：在 result 上畫出旋轉外接矩形 ===
+    for idx, comp in enumerate(keep):
+        # 只在該元件的邊界框 ROI 內找輪廓，offset 直接換回全圖座標
+        x, y, w, h = stats[comp, cv2.CC_STAT_LEFT:cv2.CC_STAT_AREA]
+        roi_mask = (labels_map[y:y + h, x:x + w] == comp).astype(np.uint8)
+        roi_contours, _ = cv2.findContours(
+            roi_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(x, y))
+        if not roi_contours:
+            continue
+        contour = max(roi_contours, key=cv2.contourArea)
+        # 1. 取得最小外接旋轉矩形
+        rect = cv2.minAreaRect(contour)
+        box = np.rint(cv2.boxPoints(rect)).astype(np.int32)
+        # === 新增：在 result 上畫出旋轉外接矩形 ===
+        if draw_boxes:
             cv2.drawContours(result, [box], 0, (0, 255, 0), 2)
             cv2.putText(result, str(idx+1), (box[0][0], box[0][1]-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            width = int(rect[1][0])
-            height = int(rect[1][1])
-            angle = rect[2]
-            # 讓長邊對齊X軸
-            if width < height:
-                angle = angle + 90
-                width, height = height, width
-            center = rect[0]
-            # 2. 取得仿射變換矩陣，將原圖旋正
+        width = int(rect[1][0])
+        height = int(rect[1][1])
+        angle = rect[2]
+        # 讓長邊對齊X軸
+        if width < height:
+            angle = angle + 90
+            width, height = height, width
+        center = rect[0]
+        expand = 3
+        w_rot = width + expand * 2
+        h_rot = height + expand * 2
+        # 2. 豆子幾乎已軸對齊時不需要仿射變換，直接以連通元件的邊界框裁切
+        if min(abs(angle) % 90.0, 90.0 - abs(angle) % 90.0) < 1.0:
+            x0 = max(0, x - expand)
+            y0 = max(0, y - expand)
+            crop = image[y0:y + h + expand, x0:x + w + expand]
+        else:
+            # 將旋轉與平移合成單一仿射矩陣，直接輸出裁切大小的小圖
+            # 避免為了裁一顆豆子而旋轉整張原圖
             M = cv2.getRotationMatrix2D(center, angle, 1.0)
-            rotated = cv2.warpAffine(image, M, (image.shape[1], image.shape[0]))
-            # 3. 以旋轉後的中心、寬高為基準，擴展3像素後裁切
-            expand = 3
-            x_rot = int(center[0] - width // 2 - expand)
-            y_rot = int(center[1] - height // 2 - expand)
-            w_rot = width + expand * 2
-            h_rot = height + expand * 2
-            # 邊界檢查
-            x_rot = max(0, x_rot)
-            y_rot = max(0, y_rot)
-            x_end = min(rotated.shape[1], x_rot + w_rot)
-            y_end = min(rotated.shape[0], y_rot + h_rot)
-            crop = rotated[y_rot:y_end, x_rot:x_end]
-            if crop.size == 0 or crop.shape[0] == 0 or crop.shape[1] == 0:
-                logger.warning(f"咖啡豆 #{idx+1} 裁切範圍無效，已跳過")
-                continue
-            rotated_beans.append({
-                "image": crop,
-                "rect": rect,
-                "box": box,
-                "angle": angle,
-                "center": center,
-                "width": width,
-                "height": height,
-                "idx": idx
-            })
-            logger.info(f"咖啡豆 #{idx+1} 旋轉並擴展區域: center={center}, w={width}, h={height}, angle={angle}")
+            M[0, 2] += w_rot / 2 - center[0]
+            M[1, 2] += h_rot / 2 - center[1]
+            crop = cv2.warpAffine(image, M, (w_rot, h_rot))
+        if crop.size == 0 or crop.shape[0] == 0 or crop.shape[1] == 0:
+            logger.warning(f"咖啡豆 #{idx+1} 裁切範圍無效，已跳過")
+            continue
+        rotated_beans.append({
+            "image": crop,
+            "rect": rect,
+            "box": box,
+            "angle": angle,
+            "center": center,
+            "width": width,
+            "height": height,
+            "idx": idx
+        })
+        logger.info(f"咖啡豆 #{idx+1} 旋轉並擴展區域: center={center}, w={width}, h={height}, angle={angle}")
     logger.info("影像處理階段結束")
     return result, rotated_beans
 
-def worker(image_queue, processed_image_folder, coffee_beans_image_folder, pixel_threshold_lower, pixel_threshold_upper):
-    while True:
-        image_path = image_queue.get()
-        if image_path is None:
-            break
-        logger.info(f"[Worker {multiprocessing.current_process().name}] 開始處理影像: {image_path}")
-        image = cv2.imread(image_path)
-        if image is None:
-            logger.warning(f"[Worker {multiprocessing.current_process().name}] 讀取失敗: {image_path}")
-            continue
-        processed_image, rotated_beans = process_coffee_beans(
-            image, show_image=False, 
-            pixel_threshold_lower=pixel_threshold_lower, 
-            pixel_threshold_upper=pixel_threshold_upper
-        )
-        result_path = f"{processed_image_folder}/{os.path.basename(image_path)}"
-        cv2.imwrite(result_path, processed_image)
-        logger.info(f"[Worker {multiprocessing.current_process().name}] 儲存框出咖啡豆的影像到 {result_path}")
-        for bean in rotated_beans:
-            crop_image = bean["image"]
-            save_image(coffee_beans_image_folder, crop_image, f"{os.path.basename(image_path).split('.')[0]}_coffee_bean")
-        logger.info(f"[Worker {multiprocessing.current_process().name}] 完成 {image_path} 的所有咖啡豆裁切與儲存")
+def _init_worker():
+    """worker 進程初始化：關閉 OpenCV 內部多執行緒，避免與進程級平行互相搶核心"""
+    os.environ["OMP_NUM_THREADS"] = "1"
+    cv2.setNumThreads(1)
+
+# 每個 worker 進程重複使用的繪圖緩衝區
+_result_buf = None
+
+def process_one(image_path, processed_image_folder, coffee_beans_image_folder, pixel_threshold_lower, pixel_threshold_upper):
+    """處理單張影像：裁切咖啡豆並儲存結果，供 ProcessPoolExecutor 調用"""
+    logger.info(f"[Worker {multiprocessing.current_process().name}] 開始處理影像: {image_path}")
+    # 一次讀入整個檔案再用 imdecode 解碼，減少 imread 的重複 open/read 系統呼叫
+    try:
+        with open(image_path, 'rb') as f:
+            buf = f.read()
+        image = cv2.imdecode(np.frombuffer(buf, np.uint8), cv2.IMREAD_COLOR)
+    except OSError:
+        image = None
+    if image is None:
+        logger.warning(f"[Worker {multiprocessing.current_process().name}] 讀取失敗: {image_path}")
+        return
+    global _result_buf
+    if _result_buf is None or _result_buf.shape != image.shape:
+        _result_buf = np.empty_like(image)
+    processed_image, rotated_beans = process_coffee_beans(
+        image, show_image=False,
+        pixel_threshold_lower=pixel_threshold_lower,
+        pixel_threshold_upper=pixel_threshold_upper,
+        out_buf=_result_buf
+    )
+    result_path = f"{processed_image_folder}/{os.path.basename(image_path)}"
+    cv2.imwrite(result_path, processed_image)
+    logger.info(f"[Worker {multiprocessing.current_process().name}] 儲存框出咖啡豆的影像到 {result_path}")
+    for bean in rotated_beans:
+        crop_image = bean["image"]
+        save_image(coffee_beans_image_folder, crop_image, f"{os.path.basename(image_path).split('.')[0]}_coffee_bean")
+    logger.info(f"[Worker {multiprocessing.current_process().name}] 完成 {image_path} 的所有咖啡豆裁切與儲存")
 
 def main(original_image_folder, processed_image_folder, coffee_beans_image_folder, show_image=False, pixel_threshold_lower=10000, pixel_threshold_upper=50000):
     if not os.path.exists(original_image_folder):
@@ -178,27 +228,18 @@ def main(original_image_folder, processed_image_folder, coffee_beans_image_folde
     )
     logger.info(f"共找到 {len(image_files)} 張影像進行處理")
 
-    # 建立 multiprocessing queue
-    image_queue = multiprocessing.Queue(maxsize=16)
-    num_workers = 4
-    workers = []
-    for _ in range(num_workers):
-        p = multiprocessing.Process(
-            target=worker, 
-            args=(image_queue, processed_image_folder, coffee_beans_image_folder, pixel_threshold_lower, pixel_threshold_upper)
-        )
-        p.start()
-        workers.append(p)
-    
-    # 將所有圖片路徑放進 queue
-    for image_path in image_files:
-        image_queue.put(image_path)
-    # 放入結束訊號
-    for _ in range(num_workers):
-        image_queue.put(None)
-    # 等待所有 worker 結束
-    for p in workers:
-        p.join()
+    # 使用 ProcessPoolExecutor 平行處理，chunksize 分批派工減少 IPC 開銷
+    num_workers = os.cpu_count() or 4
+    process_fn = partial(
+        process_one,
+        processed_image_folder=processed_image_folder,
+        coffee_beans_image_folder=coffee_beans_image_folder,
+        pixel_threshold_lower=pixel_threshold_lower,
+        pixel_threshold_upper=pixel_threshold_upper
+    )
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker) as executor:
+        for _ in executor.map(process_fn, image_files, chunksize=4):
+            pass
     logger.info("所有圖片處理完成")
 
 if __name__ == '__main__':  
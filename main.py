@@ -12,15 +12,20 @@ import os
 import sys
 import time
 import atexit
+import queue
+import threading
 import yaml
+from collections import OrderedDict
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QLabel, QVBoxLayout, 
                             QHBoxLayout, QWidget, QGridLayout, QScrollArea,
                             QPushButton, QStatusBar, QMessageBox, QSplitter,
                             QFrame, QToolBar, QAction, QSizePolicy, QProgressBar,
                             QShortcut)
-from PyQt5.QtGui import QPixmap, QImage, QKeySequence, QPalette, QColor, QFont, QIcon
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSize, QTimer, QEvent, QRect
+from PyQt5.QtGui import (QPixmap, QImage, QKeySequence, QPalette, QColor,
+                         QFont, QIcon, QPixmapCache)
+from PyQt5.QtCore import (Qt, QThread, QObject, QRunnable, QThreadPool,
+                          pyqtSignal, QSize, QTimer, QEvent, QRect)
 from PIL import Image
 import numpy as np
 
@@ -45,81 +50,137 @@ from utils.windows import LabelingWindow, OverviewWindow
 # 獲取當前模組的 logger
 logger = get_logger('main')
 
-# 檢查是否有必要的依賴
-try:
-    from PyQt5.QtWidgets import QApplication
-except ImportError:
-    logger.error("錯誤: 找不到 PyQt5 庫，請安裝: pip install PyQt5")
-    sys.exit(1)
-
-try:
-    import numpy as np
-except ImportError:
-    logger.error("錯誤: 找不到 numpy 庫，請安裝: pip install numpy")
-    sys.exit(1)
-    
-try:
-    from PIL import Image
-except ImportError:
-    logger.error("錯誤: 找不到 PIL 庫，請安裝: pip install Pillow")
-    sys.exit(1)
-    
-try:
-    import yaml
-except ImportError:
-    logger.error("錯誤: 找不到 yaml 庫，請安裝: pip install pyyaml")
-    sys.exit(1)
-
-# 獲取目前工作目錄
-logger.info(f"工作目錄: {WORKING_DIR}")
-
-
-# 嘗試多個可能的路徑
-possible_paths = get_path_configs()
-
-# 檢查每個可能的路徑
-for i, path_set in enumerate(possible_paths):
-    logger.info(f"嘗試路徑選項 {i+1}:")
-    logger.info(f"  - 資料夾: {path_set['folder']}")
-    if os.path.exists(path_set['folder']):
-        logger.info(f"  - 資料夾存在 ✓")
-        FOLDER = path_set['folder']
-        YAML_FILE = path_set['yaml_file']
-        SETTINGS_YAML = path_set['settings_yaml']
-        break
-    else:
-        logger.info(f"  - 資料夾不存在 ✗")
-else:
-    # 如果沒有找到有效路徑，使用第一個選項並顯示警告
-    logger.warning("警告: 沒有找到有效的資料夾路徑，將使用第一個選項並在啟動時提示用戶")
-    FOLDER = possible_paths[0]['folder']
-    YAML_FILE = possible_paths[0]['yaml_file']
-    SETTINGS_YAML = possible_paths[0]['settings_yaml']
-
-logger.info(f"最終使用路徑:")
-logger.info(f"  - 資料夾: {FOLDER}")
-logger.info(f"  - YAML檔: {YAML_FILE}")
-logger.info(f"  - 設定檔: {SETTINGS_YAML}")
-
-# 確保設定檔存在
-if not os.path.exists(SETTINGS_YAML):
-    logger.warning(f"警告: 設定檔 {SETTINGS_YAML} 不存在，將創建默認設定")
-    
-    # 確保目錄存在
-    settings_dir = os.path.dirname(SETTINGS_YAML)
-    if not os.path.exists(settings_dir):
+# 路徑由 _bootstrap_paths() 在 main() 啟動時決定，import 本模組不觸碰檔案系統
+FOLDER = None
+YAML_FILE = None
+SETTINGS_YAML = None
+
+def _bootstrap_paths():
+    """探測資料夾路徑並確保設定檔存在
+
+    原本這段邏輯放在模組頂層，import 時就會做 os.path.exists 探測、
+    建目錄與寫設定檔；移進函數後只在 main() 啟動時執行一次。
+    """
+    global FOLDER, YAML_FILE, SETTINGS_YAML
+
+    logger.info("工作目錄: %s", WORKING_DIR)
+
+    # 嘗試多個可能的路徑，找到第一個存在的資料夾就停止探測
+    possible_paths = get_path_configs()
+    chosen = next((path_set for path_set in possible_paths
+                   if os.path.isdir(path_set['folder'])), None)
+
+    if chosen is None:
+        # 如果沒有找到有效路徑，使用第一個選項並顯示警告
+        logger.warning("警告: 沒有找到有效的資料夾路徑，將使用第一個選項並在啟動時提示用戶")
+        for path_set in possible_paths:
+            logger.debug("探測失敗的資料夾: %s", path_set['folder'])
+        chosen = possible_paths[0]
+
+    FOLDER = chosen['folder']
+    YAML_FILE = chosen['yaml_file']
+    SETTINGS_YAML = chosen['settings_yaml']
+
+    logger.info("最終使用路徑:")
+    logger.info("  - 資料夾: %s", FOLDER)
+    logger.info("  - YAML檔: %s", YAML_FILE)
+    logger.info("  - 設定檔: %s", SETTINGS_YAML)
+
+    # 確保設定檔存在
+    if not os.path.exists(SETTINGS_YAML):
+        logger.warning("警告: 設定檔 %s 不存在，將創建默認設定", SETTINGS_YAML)
+
+        # 確保目錄存在
+        settings_dir = os.path.dirname(SETTINGS_YAML)
+        if not os.path.exists(settings_dir):
+            try:
+                os.makedirs(settings_dir)
+                logger.info("創建目錄: %s", settings_dir)
+            except Exception as e:
+                logger.error("錯誤: 無法創建目錄 %s: %s", settings_dir, e)
+
         try:
-            os.makedirs(settings_dir)
-            logger.info(f"創建目錄: {settings_dir}")
+            with open(SETTINGS_YAML, 'w', encoding='utf-8') as f:
+                yaml.dump(DEFAULT_SETTINGS, f, indent=2, allow_unicode=True)
+            logger.info("已創建默認設定檔: %s", SETTINGS_YAML)
         except Exception as e:
-            logger.error(f"錯誤: 無法創建目錄 {settings_dir}: {e}")
-    
-    try:
-        with open(SETTINGS_YAML, 'w', encoding='utf-8') as f:
-            yaml.dump(DEFAULT_SETTINGS, f, indent=2, allow_unicode=True)
-        logger.info(f"已創建默認設定檔: {SETTINGS_YAML}")
-    except Exception as e:
-        logger.error(f"錯誤: 無法創建設定檔 {SETTINGS_YAML}: {e}")
+            logger.error("錯誤: 無法創建設定檔 %s: %s", SETTINGS_YAML, e)
+
+    return FOLDER, YAML_FILE, SETTINGS_YAML
+
+def decode_display_qimage(path, cw, ch):
+    """解碼並縮放成貼合容器的 QImage
+
+    大圖先用 BILINEAR 做粗縮小（thumbnail 只會縮小、原地修改，
+    計算量遠低於 LANCZOS），最後的貼齊（含放大）交給 Qt 的 scaled。
+    """
+    img = load_image(path)
+    img.thumbnail((cw, ch), Image.BILINEAR)
+    # pil_to_qimage 會把像素緩衝區掛在 QImage 上，這裡不需再複製
+    qimg = ImageLoader.pil_to_qimage(img)
+    if qimg.width() != cw and qimg.height() != ch:
+        qimg = qimg.scaled(cw, ch, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return qimg
+
+
+class PrefetchWorker(QThread):
+    """背景預取線程，提前解碼鄰近圖片以隱藏切換圖片時的解碼延遲"""
+    image_ready = pyqtSignal(str, float, int, int, QImage)  # 路徑、mtime、容器寬高、解碼結果
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._queue = queue.Queue()
+        self._stop_requested = threading.Event()
+        self.setPriority(QThread.LowPriority)
+
+    def request(self, path, mtime, cw, ch):
+        """排入一個預取任務"""
+        self._queue.put_nowait((path, mtime, cw, ch))
+
+    def stop(self):
+        """請求停止線程"""
+        self._stop_requested.set()
+        self._queue.put_nowait(None)
+
+    def run(self):
+        """循環處理預取任務，解碼與縮放都在背景完成"""
+        while not self._stop_requested.is_set():
+            task = self._queue.get()
+            if task is None:
+                break
+            path, mtime, cw, ch = task
+            try:
+                # QImage 可跨線程傳遞（QPixmap 不行）
+                qimg = decode_display_qimage(path, cw, ch)
+                self.image_ready.emit(path, mtime, cw, ch, qimg)
+            except Exception as e:
+                logger.debug("預取圖片失敗 %s: %s", path, e)
+
+
+class _LoadTaskSignals(QObject):
+    """ImageLoadTask 的信號載體（QRunnable 本身不能發信號）"""
+    done = pyqtSignal(str, float, int, int, QImage)  # 路徑、mtime、容器寬高、解碼結果
+
+
+class ImageLoadTask(QRunnable):
+    """在 QThreadPool 中解碼當前圖片，GUI 線程只負責 setPixmap"""
+
+    def __init__(self, path, mtime, cw, ch, signals):
+        super().__init__()
+        self.path = path
+        self.mtime = mtime
+        self.cw = cw
+        self.ch = ch
+        self.signals = signals
+        self.setAutoDelete(True)
+
+    def run(self):
+        try:
+            qimg = decode_display_qimage(self.path, self.cw, self.ch)
+            self.signals.done.emit(self.path, self.mtime, self.cw, self.ch, qimg)
+        except Exception as e:
+            logger.error("背景載入圖片失敗 %s: %s", self.path, e)
+
 
 # 主應用程式類別
 class CoffeeBeanLabeler(QMainWindow):
@@ -131,6 +192,24 @@ class CoffeeBeanLabeler(QMainWindow):
         # 標記變更狀態
         self.has_changes = False
         self.img_path = None
+
+        # 資料集路徑掃描結果快取（見 _scan_dataset_paths）
+        self._dataset_scan = None
+
+        # 顯示用 QPixmap 的 LRU 快取，避免來回切換圖片時重複解碼與縮放
+        self._pixmap_cache = OrderedDict()
+        self._pixmap_cache_size = 64
+
+        # 背景預取線程，提前載入鄰近圖片
+        self._prefetch_worker = PrefetchWorker(self)
+        self._prefetch_worker.image_ready.connect(self._on_prefetched_image)
+        self._prefetch_worker.start()
+        self._pending_prefetch = set()  # 已排入預取但尚未完成的 key
+
+        # 當前圖片快取未命中時，交給全域線程池解碼，避免阻塞事件循環
+        self._load_signals = _LoadTaskSignals(self)
+        self._load_signals.done.connect(self._on_image_loaded)
+        self._pending_loads = set()  # 避免同一個 key 重複排程
         
         # 檢查資料夾是否存在
         if not os.path.exists(FOLDER):
@@ -144,9 +223,9 @@ class CoffeeBeanLabeler(QMainWindow):
             if reply == QMessageBox.Yes:
                 try:
                     os.makedirs(FOLDER, exist_ok=True)
-                    logger.info(f"已創建資料夾: {FOLDER}")
+                    logger.info("已創建資料夾: %s", FOLDER)
                 except Exception as e:
-                    logger.error(f"無法創建資料夾: {e}")
+                    logger.error("無法創建資料夾: %s", e)
                     QMessageBox.critical(self, "錯誤", f"無法創建資料夾: {e}")
                     sys.exit(1)
             else:
@@ -162,7 +241,7 @@ class CoffeeBeanLabeler(QMainWindow):
             self.labels = self.settings['labels']
             logger.info("設定已成功載入")
         except Exception as e:
-            logger.error(f"載入設定檔時出錯: {e}")
+            logger.error("載入設定檔時出錯: %s", e)
             QMessageBox.critical(self, "錯誤", f"載入設定檔時出錯: {e}")
             sys.exit(1)
             
@@ -178,7 +257,7 @@ class CoffeeBeanLabeler(QMainWindow):
                 logger.info("已自動清理並保存更新後的資料集")
                 
         except Exception as e:
-            logger.error(f"載入資料集檔案時出錯: {e}")
+            logger.error("載入資料集檔案時出錯: %s", e)
             reply = QMessageBox.warning(
                 self, "警告", 
                 f"載入資料集檔案時出錯: {e}\n\n是否要創建新的資料集檔案？",
@@ -196,14 +275,14 @@ class CoffeeBeanLabeler(QMainWindow):
         try:
             # 使用工具函數獲取圖片列表
             self.image_paths = get_image_list(FOLDER)
-            logger.info(f"已加載 {len(self.image_paths)} 張圖片")
+            logger.info("已加載 %s 張圖片", len(self.image_paths))
         except Exception as e:
-            logger.error(f"讀取圖片列表時出錯: {e}")
+            logger.error("讀取圖片列表時出錯: %s", e)
             QMessageBox.critical(self, "錯誤", f"讀取圖片列表時出錯: {e}")
             sys.exit(1)
         
         if not self.image_paths:
-            logger.error(f"在資料夾 {FOLDER} 中沒有找到任何圖片")
+            logger.error("在資料夾 %s 中沒有找到任何圖片", FOLDER)
             reply = QMessageBox.critical(
                 self, "錯誤", 
                 f"在資料夾 {FOLDER} 中沒有找到任何圖片。\n\n請確保路徑正確並包含圖片檔案。",
@@ -219,13 +298,22 @@ class CoffeeBeanLabeler(QMainWindow):
             self.current_index = len(self.image_paths) - 1
         elif self.current_index < 0:
             self.current_index = 0
+
+        # 記錄啟動時的索引，退出時索引未變就不必重寫設定檔
+        self._initial_index = self.current_index
+
+        # 建立快速導航用的布林遮罩與路徑索引
+        self._idx_of_path = {p: i for i, p in enumerate(self.image_paths)}
+        # 預先算好檔名，update_display 每次按鍵都會用到
+        self._basenames = tuple(os.path.basename(p) for p in self.image_paths)
+        self._rebuild_nav_masks()
             
         # 設定UI
         self.setup_ui()
         
         # 顯示起始資訊
-        logger.info(f"從第 {self.current_index + 1} 張圖片開始標記（共 {len(self.image_paths)} 張）")
-        logger.info(f"資料集中共有 {len(self.data['dataset'])} 張圖片的標記")
+        logger.info("從第 %s 張圖片開始標記（共 %s 張）", self.current_index + 1, len(self.image_paths))
+        logger.info("資料集中共有 %s 張圖片的標記", len(self.data['dataset']))
         self.print_help()
         
         # 註冊退出時的儲存函數
@@ -302,6 +390,9 @@ class CoffeeBeanLabeler(QMainWindow):
         for key, label in self.labels.items():
             btn = QPushButton(f"{key}: {label}")
             btn.clicked.connect(lambda checked, lbl=label: self.toggle_label(lbl))
+            # 標記為標籤按鈕，樣式由應用程式級樣式表依 active 屬性決定
+            btn.setProperty("labelButton", True)
+            btn.setProperty("active", False)
             label_layout.addWidget(btn, row, col)
             self.label_buttons[label] = btn
             
@@ -347,19 +438,18 @@ class CoffeeBeanLabeler(QMainWindow):
         QShortcut(QKeySequence(Qt.Key_PageUp), self).activated.connect(self.page_up)
         QShortcut(QKeySequence(Qt.Key_PageDown), self).activated.connect(self.page_down)
         
-        # 標籤快捷鍵
+        # 標籤快捷鍵：先驗證鍵值有效再建立，不需要 try/except
+        def create_callback(target_label):
+            # 使用函數工廠方式創建連接，避免閉包問題
+            return lambda: self.toggle_label(target_label)
+
         for key, label in self.labels.items():
-            try:
-                # 直接使用字符串鍵值設置快捷鍵
-                shortcut = QShortcut(QKeySequence(key), self)
-                # 使用函數工廠方式創建連接，避免閉包問題
-                def create_callback(target_label):
-                    return lambda: self.toggle_label(target_label)
-                
-                shortcut.activated.connect(create_callback(label))
-                logger.info(f"設置快捷鍵: '{key}' 對應標籤 '{label}'")
-            except Exception as e:
-                logger.warning(f"設置鍵值 '{key}' 的快捷鍵時出錯: {e}")
+            sequence = QKeySequence(key)
+            if sequence.count() == 0:
+                logger.warning("無效的快捷鍵鍵值: '%s'，略過標籤 '%s'", key, label)
+                continue
+            QShortcut(sequence, self).activated.connect(create_callback(label))
+            logger.debug("設置快捷鍵: '%s' 對應標籤 '%s'", key, label)
         
         # 特殊功能快捷鍵
         QShortcut(QKeySequence("Shift+C"), self).activated.connect(self.clear_labels)  # 清除標籤
@@ -374,9 +464,11 @@ class CoffeeBeanLabeler(QMainWindow):
         QShortcut(QKeySequence("Shift+Left"), self).activated.connect(self.find_prev_multi_label)  # 上一個多標籤
         QShortcut(QKeySequence("Shift+Right"), self).activated.connect(self.find_next_multi_label)  # 下一個多標籤
 
-    def check_dataset_paths(self):
-        """檢查資料集中的路徑是否都能找到對應的圖片"""
-        logger.debug("檢查資料集路徑")
+    def _scan_dataset_paths(self):
+        """掃描資料集路徑與圖片列表的對應情況，結果快取供多處使用"""
+        if getattr(self, '_dataset_scan', None) is not None:
+            return self._dataset_scan
+
         found_images = 0
         missing_images = 0
         missing_paths = []
@@ -385,42 +477,63 @@ class CoffeeBeanLabeler(QMainWindow):
         # 使用WORKING_DIR作為專案根目錄
         project_root = WORKING_DIR
         
+        # 預先建立圖片的相對路徑索引與檔名索引，
+        # 避免對每個資料集路徑重新掃描整個圖片列表（O(N·M) -> O(N+M)）
+        rel_map = {}
+        base_map = {}
+        for img_path in self.image_paths:
+            try:
+                rel_path = normalize_path(os.path.relpath(img_path, project_root))
+            except ValueError:
+                continue
+            rel_map[rel_path] = img_path
+            base_map.setdefault(os.path.basename(rel_path), []).append(rel_path)
+
         for path in self.data['dataset'].keys():
             # 檢查絕對路徑或轉換後的絕對路徑是否在圖片列表中
             if path in image_paths_set:
                 found_images += 1
+                continue
+
+            # 嘗試將數據集中可能使用的相對路徑轉換為絕對路徑再比較
+            if not os.path.isabs(path):
+                abs_path = normalize_path(os.path.abspath(os.path.join(project_root, path)))
+                if abs_path in image_paths_set:
+                    found_images += 1
+                    continue
+
+            # 反過來，只跟檔名相同的候選相對路徑比較尾端是否吻合
+            data_rel_path = normalize_path(path)
+            candidates = base_map.get(os.path.basename(data_rel_path), ())
+            if data_rel_path in rel_map or any(
+                    rel_path.endswith(data_rel_path) or data_rel_path.endswith(rel_path)
+                    for rel_path in candidates):
+                found_images += 1
             else:
-                # 嘗試將數據集中可能使用的相對路徑轉換為絕對路徑再比較
-                if not os.path.isabs(path):
-                    abs_path = normalize_path(os.path.abspath(os.path.join(project_root, path)))
-                    if abs_path in image_paths_set:
-                        found_images += 1
-                        continue
-                
-                # 反過來，嘗試將圖片路徑轉換為相對路徑比較
-                rel_path_found = False
-                try:
-                    for img_path in self.image_paths:
-                        rel_path = normalize_path(os.path.relpath(img_path, project_root))
-                        data_rel_path = normalize_path(path)
-                        if rel_path.endswith(data_rel_path) or data_rel_path.endswith(rel_path):
-                            found_images += 1
-                            rel_path_found = True
-                            break
-                except:
-                    pass
-                
-                if not rel_path_found:
-                    missing_images += 1
-                    missing_paths.append(path)
-        
+                missing_images += 1
+                missing_paths.append(path)
+
+        self._dataset_scan = {
+            'found_images': found_images,
+            'missing_images': missing_images,
+            'missing_paths': missing_paths
+        }
+        return self._dataset_scan
+
+    def check_dataset_paths(self):
+        """檢查資料集中的路徑是否都能找到對應的圖片"""
+        logger.debug("檢查資料集路徑")
+        scan = self._scan_dataset_paths()
+        missing_images = scan['missing_images']
+        missing_paths = scan['missing_paths']
+
         if missing_images > 0:
-            logger.warning(f"資料集中有 {missing_images} 張圖片路徑無法找到")
+            logger.warning("資料集中有 %s 張圖片路徑無法找到", missing_images)
             # 最多顯示5個錯誤路徑
             for i, path in enumerate(missing_paths[:5]):
-                logger.warning(f"  找不到: {path}")
+                logger.warning("  找不到: %s", path)
             if len(missing_paths) > 5:
-                logger.warning(f"  還有 {len(missing_paths) - 5} 個路徑未顯示...")
+                logger.warning("  還有 %s 個路徑未顯示...", len(missing_paths) - 5)
 
     def show_welcome_message(self):
         """顯示歡迎訊息"""
@@ -433,19 +546,9 @@ class CoffeeBeanLabeler(QMainWindow):
             f"資料集中已有 {len(self.data['dataset'])} 張圖片的標記\n"
         )
         
-        # 檢查是否有找不到的路徑，如果有就顯示警告
-        found_images = 0
-        missing_images = 0
-        missing_paths = []
-        image_paths_set = set(self.image_paths)
-        
-        for path in self.data['dataset'].keys():
-            if path in image_paths_set:
-                found_images += 1
-            else:
-                missing_images += 1
-                missing_paths.append(path)
-        
+        # 檢查是否有找不到的路徑，如果有就顯示警告（重用啟動時的掃描結果）
+        missing_images = self._scan_dataset_paths()['missing_images']
+
         if missing_images > 0:
             welcome_text += f"\n警告: 資料集中有 {missing_images} 張圖片路徑無法找到"
         
@@ -479,84 +582,144 @@ class CoffeeBeanLabeler(QMainWindow):
         
         # 確保圖片路徑在資料集中
         if current_path not in self.data['dataset']:
-            self.data['dataset'][current_path] = []
-            
+            self.data['dataset'][current_path] = set()
+
         # 載入圖片
         try:
-            img = load_image(current_path)
-            
             # 取得視窗可用大小
             image_container_size = self.image_container.size()
             container_width = image_container_size.width() - 40  # 考慮邊距
             container_height = image_container_size.height() - 60  # 考慮邊距和底部空間
-            
-            # 獲取原始圖片尺寸
-            orig_width, orig_height = img.size
-            
-            # 計算最佳顯示尺寸
-            if orig_width > 0 and orig_height > 0:
-                # 計算縮放比例
-                width_ratio = container_width / orig_width
-                height_ratio = container_height / orig_height
-                
-                # 使用較小的比例，確保完整顯示圖片
-                scale_ratio = min(width_ratio, height_ratio)
-                
-                # 確保比例不小於1，如果圖片小於容器，則放大到適合的大小
-                if scale_ratio < 1.0 or scale_ratio > 1.0:
-                    # 計算新尺寸
-                    new_width = int(orig_width * scale_ratio)
-                    new_height = int(orig_height * scale_ratio)
-                    
-                    # 確保至少有最小尺寸
-                    new_width = max(new_width, 100)
-                    new_height = max(new_height, 100)
-                    
-                    # 調整圖片大小
-                    img = img.resize((new_width, new_height), Image.LANCZOS)
-            
-            # 轉換為QPixmap並顯示
-            qimg = ImageLoader.pil_to_qimage(img)
-            pixmap = QPixmap.fromImage(qimg)
-            
-            # 設置圖片到標籤
-            self.image_label.setPixmap(pixmap)
-            self.image_label.setMinimumSize(pixmap.width(), pixmap.height())
-            
+
+            # 快取命中直接顯示；未命中交給線程池解碼，先顯示占位文字
+            cw, ch = self._bucket_container(container_width, container_height)
+            mtime = self._safe_mtime(current_path)
+            key = (current_path, mtime, cw, ch)
+
+            pixmap = self._cache_lookup(key)
+            if pixmap is not None:
+                self.image_label.setPixmap(pixmap)
+                self.image_label.setMinimumSize(pixmap.width(), pixmap.height())
+            else:
+                self.image_label.setText("載入中...")
+                if key not in self._pending_loads:
+                    self._pending_loads.add(key)
+                    QThreadPool.globalInstance().start(
+                        ImageLoadTask(current_path, mtime, cw, ch, self._load_signals))
+
+
             # 更新視窗標題
-            self.setWindowTitle(f"咖啡豆標籤標記工具 - {os.path.basename(current_path)}")
-            
+            self.setWindowTitle(f"咖啡豆標籤標記工具 - {self._basenames[self.current_index]}")
+
+            # 預取鄰近圖片，讓下一次切換直接命中快取
+            self._prefetch_neighbors(container_width, container_height)
+
         except Exception as e:
-            logger.error(f"無法載入圖片: {e}")
+            logger.error("無法載入圖片: %s", e)
             self.image_label.setText(f"無法載入圖片: {e}")
             
         # 更新標籤顯示
-        current_labels = self.data['dataset'].get(current_path, [])
-        self.label_info.setText(f"當前標籤: {current_labels}")
+        current_labels = self.data['dataset'].get(current_path, set())
+        self.label_info.setText(f"當前標籤: {sorted(current_labels)}")
         
         # 更新按鈕狀態
         for label, btn in self.label_buttons.items():
-            if label in current_labels:
-                btn.setStyleSheet(STYLES["highlighted_button"])
-            else:
-                btn.setStyleSheet(STYLES["button"])
-                
+            self._set_button_active(btn, label in current_labels)
+
         # 更新狀態欄
-        self.statusBar().showMessage(f"圖片 {self.current_index + 1}/{len(self.image_paths)} | {os.path.basename(current_path)}")
+        self.statusBar().showMessage(f"圖片 {self.current_index + 1}/{len(self.image_paths)} | {self._basenames[self.current_index]}")
+
+    @staticmethod
+    def _bucket_container(container_width, container_height):
+        """容器尺寸以32px為單位取整，視窗微調時仍能命中快取"""
+        cw = max((container_width // 32) * 32, 32)
+        ch = max((container_height // 32) * 32, 32)
+        return cw, ch
+
+    @staticmethod
+    def _safe_mtime(path):
+        """取得檔案 mtime，失敗時回傳 0"""
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0
+
+    def _cache_lookup(self, key):
+        """查詢顯示用 QPixmap 的 LRU 快取，命中時移到最新"""
+        cached = self._pixmap_cache.get(key)
+        if cached is not None:
+            self._pixmap_cache.move_to_end(key)
+        return cached
+
+    def _cache_store(self, key, pixmap):
+        """存入快取並淘汰最舊的項目"""
+        self._pixmap_cache[key] = pixmap
+        while len(self._pixmap_cache) > self._pixmap_cache_size:
+            self._pixmap_cache.popitem(last=False)
+
+    def _on_image_loaded(self, path, mtime, cw, ch, qimage):
+        """線程池解碼完成；忽略過時回應，只顯示仍是當前圖片的結果"""
+        key = (path, mtime, cw, ch)
+        self._pending_loads.discard(key)
+        pixmap = QPixmap.fromImage(qimage)
+        self._cache_store(key, pixmap)
+
+        # 使用者可能已經切到別張圖，過時的結果只進快取不上畫面
+        if path != self.image_paths[self.current_index]:
+            return
+        self.image_label.setPixmap(pixmap)
+        self.image_label.setMinimumSize(pixmap.width(), pixmap.height())
+
+    def _on_prefetched_image(self, path, mtime, cw, ch, qimage):
+        """預取線程完成解碼後，在主線程轉成 QPixmap 放入快取"""
+        key = (path, mtime, cw, ch)
+        self._pending_prefetch.discard(key)
+        if key in self._pixmap_cache:
+            return
+        self._cache_store(key, QPixmap.fromImage(qimage))
+
+    def _prefetch_neighbors(self, container_width, container_height):
+        """排程預取目前圖片的鄰近圖片（下一張優先）"""
+        cw, ch = self._bucket_container(container_width, container_height)
+        for offset in (1, -1, 2):
+            idx = self.current_index + offset
+            if 0 <= idx < len(self.image_paths):
+                path = self.image_paths[idx]
+                key = (path, self._safe_mtime(path), cw, ch)
+                # 已在快取或已排入預取的 key 不重複排程，按住方向鍵
+                # 連發時同一批鄰居不會被塞進佇列解碼好幾次
+                if (key not in self._pixmap_cache
+                        and key not in self._pending_prefetch):
+                    self._pending_prefetch.add(key)
+                    self._prefetch_worker.request(*key)
+
+    def closeEvent(self, event):
+        """視窗關閉時停止預取線程與線程池任務"""
+        self._prefetch_worker.stop()
+        self._prefetch_worker.wait(500)
+        QThreadPool.globalInstance().waitForDone(500)
+        event.accept()
 
     def save_on_exit(self):
-        """退出時保存數據"""
-        logger.info("保存資料並退出")
-        save_dataset(YAML_FILE, self.data, WORKING_DIR)
-        save_settings(SETTINGS_YAML, self.settings, self.current_index)
+        """退出時保存數據，無變更時跳過，避免重寫整份 YAML"""
+        if self.has_changes:
+            logger.info("保存資料並退出")
+            save_dataset(YAML_FILE, self.data, WORKING_DIR)
+            self.has_changes = False
+        else:
+            logger.info("資料集未變更，略過儲存")
+
+        if self.current_index != self._initial_index:
+            save_settings(SETTINGS_YAML, self.settings, self.current_index)
+            self._initial_index = self.current_index
         logger.info("資料已保存")
 
     def show_overview(self):
         """顯示總覽模式"""
         logger.info("打開總覽模式")
         
-        # 先建立載入對話框
-        loading_dialog = LoadingDialog(parent=self)
+        # 先取得載入對話框（單例，重複開啟總覽時重用同一個）
+        loading_dialog = LoadingDialog.instance(parent=self)
         loading_dialog.setModal(True)  # 確保對話框為模態，阻止用戶操作主窗口
         loading_dialog.update_progress(0, 1)  # 初始化進度
         loading_dialog.show()
@@ -616,7 +779,7 @@ class CoffeeBeanLabeler(QMainWindow):
                 overview_window.show()
                 overview_window.activateWindow()  # 確保視窗在前台
         except Exception as e:
-            logger.error(f"創建總覽視窗時出錯: {e}")
+            logger.error("創建總覽視窗時出錯: %s", e)
             loading_dialog.close()
             QMessageBox.critical(self, "錯誤", f"創建總覽視窗時出錯: {e}")
     
@@ -626,10 +789,9 @@ class CoffeeBeanLabeler(QMainWindow):
             # 先處理任何待處理的事件
             QApplication.processEvents()
             
-            # 先確保對話框已關閉
+            # 先確保對話框已關閉（單例會重複使用，只關不銷毀）
             loading_dialog.close()
-            loading_dialog.deleteLater()
-            
+
             # 再次處理事件，確保界面響應
             QApplication.processEvents()
             
@@ -638,22 +800,21 @@ class CoffeeBeanLabeler(QMainWindow):
             overview_window.activateWindow()  # 確保視窗在前台
             logger.info("總覽視窗已顯示")
         except Exception as e:
-            logger.error(f"顯示總覽視窗時出錯: {e}")
+            logger.error("顯示總覽視窗時出錯: %s", e)
             # 確保即使出錯也關閉加載對話框
             try:
                 loading_dialog.close()
-                loading_dialog.deleteLater()
             except:
                 pass
     
     def on_view_image_from_overview(self, img_path):
         """從總覽模式選擇圖片進行標記"""
         # 增加日誌以協助調試
-        logger.info(f"從總覽模式選擇圖片: {img_path}")
+        logger.info("從總覽模式選擇圖片: %s", img_path)
         
         # 確保路徑有效
         if not img_path or not os.path.exists(img_path):
-            logger.error(f"圖片路徑無效: {img_path}")
+            logger.error("圖片路徑無效: %s", img_path)
             QMessageBox.warning(self, "警告", f"無法找到圖片: {img_path}")
             return
             
@@ -675,7 +836,12 @@ class CoffeeBeanLabeler(QMainWindow):
     
     def on_labels_changed(self, img_path, new_labels):
         """標籤變更時更新總覽視窗"""
-        logger.debug(f"標籤已變更: {img_path}, 新標籤: {new_labels}")
+        logger.debug("標籤已變更: %s, 新標籤: %s", img_path, new_labels)
+        self.has_changes = True
+        # 同步更新導航遮罩
+        index = self._idx_of_path.get(img_path)
+        if index is not None:
+            self._update_nav_masks(index, new_labels)
         # 獲取總覽視窗單例（如果存在）
         overview_window = OverviewWindow._instance
         if overview_window is not None and overview_window.isVisible():
@@ -723,29 +889,31 @@ class CoffeeBeanLabeler(QMainWindow):
             return
             
         current_path = self.image_paths[self.current_index]
-        
+
         if current_path not in self.data['dataset']:
-            self.data['dataset'][current_path] = []
-            
+            self.data['dataset'][current_path] = set()
+
         current_labels = self.data['dataset'][current_path]
-        
+
         if label in current_labels:
-            current_labels.remove(label)
+            current_labels.discard(label)
         else:
-            current_labels.append(label)
-            
-        self.data['dataset'][current_path] = current_labels
+            current_labels.add(label)
+        self.has_changes = True
+        self._update_nav_masks(self.current_index, current_labels)
         self.update_label_display()
-    
+
     def clear_labels(self):
         """清除所有標籤"""
         if not self.image_paths:
             return
-            
+
         current_path = self.image_paths[self.current_index]
-        
+
         if current_path in self.data['dataset']:
-            self.data['dataset'][current_path] = []
+            self.data['dataset'][current_path] = set()
+            self.has_changes = True
+            self._update_nav_masks(self.current_index, set())
             self.update_label_display()
     
     def update_label_display(self):
@@ -754,131 +922,113 @@ class CoffeeBeanLabeler(QMainWindow):
             return
             
         current_path = self.image_paths[self.current_index]
-        current_labels = self.data['dataset'].get(current_path, [])
-        
-        self.label_info.setText(f"當前標籤: {current_labels}")
-        
-        # 更新按鈕狀態
-        for label, btn in self.label_buttons.items():
-            if label in current_labels:
-                btn.setStyleSheet(STYLES["highlighted_button"])
-            else:
-                btn.setStyleSheet(STYLES["button"])
-    
+        current_labels = self.data['dataset'].get(current_path, set())
+
+        self.label_info.setText(f"當前標籤: {sorted(current_labels)}")
+
+        # 更新按鈕狀態；關閉更新讓 Qt 把多顆按鈕的重繪合併成一次
+        self.setUpdatesEnabled(False)
+        try:
+            for label, btn in self.label_buttons.items():
+                self._set_button_active(btn, label in current_labels)
+        finally:
+            self.setUpdatesEnabled(True)
+
+    @staticmethod
+    def _set_button_active(btn, active):
+        """切換按鈕的 active 屬性；狀態沒變就不觸發重新 polish"""
+        if bool(btn.property("active")) == active:
+            return
+        btn.setProperty("active", active)
+        btn.style().unpolish(btn)
+        btn.style().polish(btn)
+
     # 快速導航功能
-    def find_prev_not_ok(self):
-        """查找前一張不是OK的圖片"""
+    def _rebuild_nav_masks(self):
+        """從資料集重建快速導航遮罩（非OK / 白名單 / 多標籤）"""
+        n = len(self.image_paths)
+        self._is_not_ok = np.zeros(n, dtype=bool)
+        self._has_whitelist = np.zeros(n, dtype=bool)
+        self._is_multi = np.zeros(n, dtype=bool)
+
+        dataset = self.data['dataset']
+        for i, path in enumerate(self.image_paths):
+            labels = dataset.get(path)
+            if labels:
+                self._update_nav_masks(i, labels)
+
+    def _update_nav_masks(self, index, labels):
+        """更新單一索引的導航遮罩，標籤變更時增量維護"""
+        self._is_not_ok[index] = bool(labels) and "OK" not in labels
+        self._has_whitelist[index] = any(label in WHITE_LIST for label in labels)
+        self._is_multi[index] = len(labels) > 1
+
+    def _find_prev_in_mask(self, mask, not_found_message):
+        """往前尋找遮罩為真的索引，一次 C 級掃描取代逐張 Python 迴圈"""
         if not self.image_paths:
             return
-            
-        index = self.current_index - 1
-        while index >= 0:
-            path = self.image_paths[index]
-            labels = self.data['dataset'].get(path, [])
-            if labels and "OK" not in labels:
-                self.current_index = index
-                self.update_display()
-                return
-            index -= 1
-            
-        QMessageBox.information(self, "提示", "已經是第一張非OK圖片")
-    
-    def find_next_not_ok(self):
-        """查找下一張不是OK的圖片"""
+        hits = np.flatnonzero(mask[:self.current_index])
+        if hits.size:
+            self.current_index = int(hits[-1])
+            self.update_display()
+        else:
+            QMessageBox.information(self, "提示", not_found_message)
+
+    def _find_next_in_mask(self, mask, not_found_message):
+        """往後尋找遮罩為真的索引"""
         if not self.image_paths:
             return
-            
-        index = self.current_index + 1
-        while index < len(self.image_paths):
-            path = self.image_paths[index]
-            labels = self.data['dataset'].get(path, [])
-            if labels and "OK" not in labels:
-                self.current_index = index
-                self.update_display()
-                return
-            index += 1
-            
-        QMessageBox.information(self, "提示", "已經是最後一張非OK圖片")
-    
+        hits = np.flatnonzero(mask[self.current_index + 1:])
+        if hits.size:
+            self.current_index += 1 + int(hits[0])
+            self.update_display()
+        else:
+            QMessageBox.information(self, "提示", not_found_message)
+
+    def find_prev_not_ok(self):
+        """查找前一張不是OK的圖片"""
+        self._find_prev_in_mask(self._is_not_ok, "已經是第一張非OK圖片")
+
+    def find_next_not_ok(self):
+        """查找下一張不是OK的圖片"""
+        self._find_next_in_mask(self._is_not_ok, "已經是最後一張非OK圖片")
+
     def find_prev_whitelist(self):
         """查找前一張含有白名單標籤的圖片"""
-        if not self.image_paths:
-            return
-            
-        index = self.current_index - 1
-        while index >= 0:
-            path = self.image_paths[index]
-            labels = self.data['dataset'].get(path, [])
-            if any(label in WHITE_LIST for label in labels):
-                self.current_index = index
-                self.update_display()
-                return
-            index -= 1
-            
-        QMessageBox.information(self, "提示", "已經是第一張含有白名單標籤的圖片")
-    
+        self._find_prev_in_mask(self._has_whitelist, "已經是第一張含有白名單標籤的圖片")
+
     def find_next_whitelist(self):
         """查找下一張含有白名單標籤的圖片"""
-        if not self.image_paths:
-            return
-            
-        index = self.current_index + 1
-        while index < len(self.image_paths):
-            path = self.image_paths[index]
-            labels = self.data['dataset'].get(path, [])
-            if any(label in WHITE_LIST for label in labels):
-                self.current_index = index
-                self.update_display()
-                return
-            index += 1
-            
-        QMessageBox.information(self, "提示", "已經是最後一張含有白名單標籤的圖片")
-    
+        self._find_next_in_mask(self._has_whitelist, "已經是最後一張含有白名單標籤的圖片")
+
     def find_prev_multi_label(self):
         """查找前一張有多個標籤的圖片"""
-        if not self.image_paths:
-            return
-            
-        index = self.current_index - 1
-        while index >= 0:
-            path = self.image_paths[index]
-            labels = self.data['dataset'].get(path, [])
-            if len(labels) > 1:
-                self.current_index = index
-                self.update_display()
-                return
-            index -= 1
-            
-        QMessageBox.information(self, "提示", "已經是第一張有多個標籤的圖片")
-    
+        self._find_prev_in_mask(self._is_multi, "已經是第一張有多個標籤的圖片")
+
     def find_next_multi_label(self):
         """查找下一張有多個標籤的圖片"""
-        if not self.image_paths:
-            return
-            
-        index = self.current_index + 1
-        while index < len(self.image_paths):
-            path = self.image_paths[index]
-            labels = self.data['dataset'].get(path, [])
-            if len(labels) > 1:
-                self.current_index = index
-                self.update_display()
-                return
-            index += 1
-            
-        QMessageBox.information(self, "提示", "已經是最後一張有多個標籤的圖片")
+        self._find_next_in_mask(self._is_multi, "已經是最後一張有多個標籤的圖片")
 
 def main():
     """主函數"""
     try:
         # 設置全局日誌級別（可根據需要更改）
         set_global_log_level('INFO')
-        
+
+        # 決定資料夾與設定檔路徑（含必要時建立預設設定檔）
+        _bootstrap_paths()
+
         app = QApplication(sys.argv)
         
         # 設置應用程式風格
         app.setStyle('Fusion')
-        
+
+        # 標籤按鈕樣式集中在應用程式級樣式表，QSS 只解析這一次
+        app.setStyleSheet(STYLES["label_button_states"])
+
+        # 放大縮略圖共用快取，避免重複的 QImage->QPixmap 轉換與縮放
+        QPixmapCache.setCacheLimit(50 * 1024)  # KB
+
         # 創建主視窗
         window = CoffeeBeanLabeler()
         window.show()
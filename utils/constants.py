@@ -1,4 +1,5 @@
 import os
+import functools
 
 # 獲取目前工作目錄 - 從constants.py向上三層為工作目錄
 WORKING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
@@ -7,12 +8,16 @@ WORKING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
 DATASET_NAME = "dataset/coffee_bean_dataset"
 SUB_DATASET_NAME = "splits/split_6"  # 換分割檔的時候改這裡
 THUMBNAIL_SIZE = (200, 200)  # 縮圖尺寸用於總覽
-WHITE_LIST = ["IMMATURE"]  # 白名單標籤
+WHITE_LIST = frozenset({"IMMATURE"})  # 白名單標籤
 MAX_IMAGES = 2000  # 最多顯示200張圖片
 
 # 文件路徑配置
+@functools.lru_cache(maxsize=1)
 def get_path_configs():
-    """獲取文件路徑配置，返回有效的路徑集合"""
+    """獲取文件路徑配置，返回有效的路徑集合（結果只計算一次）"""
+    # 上層目錄只算一次，下面會用到三次
+    parent_dir = os.path.dirname(WORKING_DIR)
+
     # 嘗試多個可能的路徑
     possible_paths = [
         # 1. 原始相對路徑
@@ -23,9 +28,9 @@ def get_path_configs():
         },
         # 2. 上一級目錄
         {
-            "folder": os.path.join(os.path.dirname(WORKING_DIR), DATASET_NAME, SUB_DATASET_NAME),
-            "yaml_file": os.path.join(os.path.dirname(WORKING_DIR), DATASET_NAME, f"{SUB_DATASET_NAME}_dataset.yaml"),
-            "settings_yaml": os.path.join(os.path.dirname(WORKING_DIR), "settings.yaml")
+            "folder": os.path.join(parent_dir, DATASET_NAME, SUB_DATASET_NAME),
+            "yaml_file": os.path.join(parent_dir, DATASET_NAME, f"{SUB_DATASET_NAME}_dataset.yaml"),
+            "settings_yaml": os.path.join(parent_dir, "settings.yaml")
         },
         # 3. dataset 子目錄中
         {
@@ -105,5 +110,31 @@ STYLES = {
         QPushButton:pressed {
             background-color: #92b1b1;
         }
+    """,
+    # 應用程式級樣式表：標籤按鈕以 active 動態屬性切換高亮，
+    # 切換時只需 polish，不必每次導航重新解析 QSS 字串
+    "label_button_states": """
+        QPushButton[labelButton="true"] {
+            background-color: #e0e0e0;
+            border: 1px solid #c0c0c0;
+            border-radius: 3px;
+            padding: 5px;
+        }
+        QPushButton[labelButton="true"]:hover {
+            background-color: #d0d0d0;
+        }
+        QPushButton[labelButton="true"]:pressed {
+            background-color: #c0c0c0;
+        }
+        QPushButton[labelButton="true"][active="true"] {
+            background-color: #a3c2c2;
+            border: 1px solid #8ab;
+        }
+        QPushButton[labelButton="true"][active="true"]:hover {
+            background-color: #b4d3d3;
+        }
+        QPushButton[labelButton="true"][active="true"]:pressed {
+            background-color: #92b1b1;
+        }
     """
-} 
\ No newline at end of file
+}
\ No newline at end of file
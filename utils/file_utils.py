@@ -1,39 +1,49 @@
 import os
+import json
 import yaml
 import time
 import shutil
 from .logger import get_logger
 from .constants import DEFAULT_SETTINGS
 
+# 優先使用 libyaml 的 C 實作，大資料集的解析/序列化快一個數量級
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
+
 # 獲取當前模組的 logger
 logger = get_logger('file_utils')
 
 def normalize_path(path):
-    """統一路徑格式，將所有路徑轉換為使用正斜線"""
-    logger.debug(f"正規化路徑: {path}")
-    return path.replace('\\', '/')
+    """統一路徑格式，將所有路徑轉換為使用正斜線
+
+    此函數在 load/save/clean_dataset 的迴圈中逐項呼叫，
+    不做任何記錄；沒有反斜線時直接回傳原字串避免多餘配置。
+    """
+    return path.replace('\\', '/') if '\\' in path else path
 
 def load_settings(yaml_file):
     """載入設定檔，包含標籤和上次的索引"""
-    logger.info(f"載入設定檔: {yaml_file}")
+    logger.info("載入設定檔: %s", yaml_file)
     try:
         with open(yaml_file, 'r', encoding='utf-8') as file:
-            settings = yaml.safe_load(file)
+            settings = yaml.load(file, Loader=YamlLoader)
             result = {
                 'labels': settings.get('labels', DEFAULT_SETTINGS['labels']),
                 'last_index': settings.get('last_index', 0)
             }
-            logger.debug(f"設定檔已載入: {result}")
+            logger.debug("設定檔已載入: %s", result)
             return result
     except Exception as e:
-        logger.error(f"載入設定檔時發生錯誤: {e}")
+        logger.error("載入設定檔時發生錯誤: %s", e)
         # 返回預設設定
         logger.info("使用預設設定")
         return DEFAULT_SETTINGS.copy()
 
 def save_settings(yaml_file, settings_data, current_index):
     """保存設定檔，更新上次的索引"""
-    logger.info(f"保存設定檔: {yaml_file}, 當前索引: {current_index}")
+    logger.info("保存設定檔: %s, 當前索引: %s", yaml_file, current_index)
     try:
         # 確保目錄存在
         os.makedirs(os.path.dirname(yaml_file), exist_ok=True)
@@ -41,7 +51,7 @@ def save_settings(yaml_file, settings_data, current_index):
         # 讀取現有設定或創建新的
         if os.path.exists(yaml_file):
             with open(yaml_file, 'r', encoding='utf-8') as file:
-                settings = yaml.safe_load(file) or {}
+                settings = yaml.load(file, Loader=YamlLoader) or {}
         else:
             settings = {}
         
@@ -50,52 +60,99 @@ def save_settings(yaml_file, settings_data, current_index):
         
         # 保存設定
         with open(yaml_file, 'w', encoding='utf-8') as file:
-            yaml.dump(settings, file, indent=2, allow_unicode=True)
+            yaml.dump(settings, file, Dumper=YamlDumper, indent=2, allow_unicode=True)
         
         logger.debug("設定檔已保存")
         return True
     except Exception as e:
-        logger.error(f"保存設定檔時發生錯誤: {e}")
+        logger.error("保存設定檔時發生錯誤: %s", e)
         return False
 
+def _dataset_cache_file(yaml_file):
+    """資料集的 JSON 快取路徑（JSON 解析遠快於 YAML）"""
+    return yaml_file + '.cache.json'
+
+def _load_dataset_cache(yaml_file, project_root):
+    """嘗試從 JSON 快取載入資料集，快取過期或不符時回傳 None"""
+    cache_file = _dataset_cache_file(yaml_file)
+    try:
+        if os.path.getmtime(cache_file) < os.path.getmtime(yaml_file):
+            return None
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        # 路徑正規化依賴專案根目錄，不一致時快取作廢
+        if cached.get('project_root') != project_root:
+            return None
+        return {'dataset': {path: set(labels)
+                            for path, labels in cached['dataset'].items()}}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def _write_dataset_cache(yaml_file, project_root, data):
+    """在成功解析 YAML 後寫出 JSON 快取，失敗時僅記錄不中斷"""
+    cache_file = _dataset_cache_file(yaml_file)
+    try:
+        payload = {
+            'project_root': project_root,
+            'dataset': {path: sorted(labels)
+                        for path, labels in data['dataset'].items()},
+        }
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+        logger.debug("已寫出資料集快取: %s", cache_file)
+    except Exception as e:
+        logger.warning("寫出資料集快取失敗: %s", e)
+
 def load_dataset(yaml_file, project_root):
     """載入或創建資料集，並確保所有路徑格式一致"""
-    logger.info(f"載入資料集: {yaml_file}")
-    
+    logger.info("載入資料集: %s", yaml_file)
+
     try:
         if os.path.exists(yaml_file):
+            # JSON 快取比 YAML 解析快得多，mtime 不舊於來源檔時直接採用
+            cached = _load_dataset_cache(yaml_file, project_root)
+            if cached is not None:
+                logger.info("從 JSON 快取載入資料集，包含 %s 項記錄", len(cached['dataset']))
+                return cached
+
             with open(yaml_file, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f) or {'dataset': {}}
+                data = yaml.load(f, Loader=YamlLoader) or {'dataset': {}}
                 
                 # 統一路徑格式
                 normalized_data = {'dataset': {}}
-                
-                logger.debug(f"載入資料集時的專案根目錄: {project_root}")
-                
+
+                logger.debug("載入資料集時的專案根目錄: %s", project_root)
+
+                # abspath 每次都會 getcwd，專案根目錄只需展開一次
+                root = normalize_path(os.path.abspath(project_root))
+                _isabs = os.path.isabs
+
                 for path, labels in data['dataset'].items():
                     # 正規化路徑斜線
                     normalized_path = normalize_path(path)
-                    
+
                     # 如果是相對路徑，則轉換為絕對路徑以便程式內部使用
-                    if not os.path.isabs(normalized_path):
-                        # 從專案根目錄開始組合路徑
-                        abs_path = os.path.abspath(os.path.join(project_root, normalized_path))
-                        normalized_path = normalize_path(abs_path)
-                    
-                    normalized_data['dataset'][normalized_path] = labels
-                
-                logger.info(f"成功載入資料集，包含 {len(normalized_data['dataset'])} 項記錄")
+                    if not _isabs(normalized_path):
+                        # 從展開後的根目錄組合路徑，normpath 處理 '..' 與重複斜線
+                        normalized_path = normalize_path(
+                            os.path.normpath(root + '/' + normalized_path))
+
+                    # 內部以 set 儲存標籤，成員檢查與切換都是 O(1)
+                    normalized_data['dataset'][normalized_path] = set(labels or [])
+
+                logger.info("成功載入資料集，包含 %s 項記錄", len(normalized_data['dataset']))
+                _write_dataset_cache(yaml_file, project_root, normalized_data)
                 return normalized_data
         else:
-            logger.warning(f"資料集文件不存在: {yaml_file}，將創建新的資料集")
+            logger.warning("資料集文件不存在: %s，將創建新的資料集", yaml_file)
             return {'dataset': {}}
     except Exception as e:
-        logger.error(f"載入資料集時發生錯誤: {e}")
+        logger.error("載入資料集時發生錯誤: %s", e)
         return {'dataset': {}}
 
 def save_dataset(yaml_file, data, project_root):
     """保存資料集，並自動創建備份"""
-    logger.info(f"正在儲存資料集: {yaml_file}")
+    logger.info("正在儲存資料集: %s", yaml_file)
     
     try:
         # 創建備份目錄
@@ -103,9 +160,9 @@ def save_dataset(yaml_file, data, project_root):
         if not os.path.exists(backup_dir):
             try:
                 os.makedirs(backup_dir)
-                logger.info(f"已創建備份目錄: {backup_dir}")
+                logger.info("已創建備份目錄: %s", backup_dir)
             except Exception as e:
-                logger.warning(f"無法創建備份目錄 {backup_dir}: {e}")
+                logger.warning("無法創建備份目錄 %s: %s", backup_dir, e)
         
         # 創建帶有時間戳的備份檔名
         timestamp = time.strftime("%Y%m%d_%H%M%S")
@@ -115,44 +172,61 @@ def save_dataset(yaml_file, data, project_root):
         if os.path.exists(yaml_file):
             try:
                 shutil.copy2(yaml_file, backup_file)
-                logger.info(f"已創建備份: {backup_file}")
+                logger.info("已創建備份: %s", backup_file)
             except Exception as e:
-                logger.warning(f"備份失敗: {e}")
+                logger.warning("備份失敗: %s", e)
         
         # 統一路徑格式，確保使用相對路徑
         normalized_data = {'dataset': {}}
-        
-        logger.debug(f"儲存資料集時的專案根目錄: {project_root}")
-        
+
+        logger.debug("儲存資料集時的專案根目錄: %s", project_root)
+
+        # 根目錄只正規化一次；位於根目錄下的路徑直接剝前綴，
+        # 不必每個項目都走 os.path.relpath
+        root = normalize_path(os.path.abspath(project_root))
+        root_prefix = root + '/'
+        _isabs = os.path.isabs
+
         for path, labels in data['dataset'].items():
             # 處理絕對路徑轉換為相對路徑
-            if os.path.isabs(path):
-                try:
-                    # 嘗試將絕對路徑轉換為相對於專案根目錄的路徑
-                    rel_path = os.path.relpath(path, project_root)
-                    # 確保使用正斜線
-                    normalized_path = normalize_path(rel_path)
-                except ValueError:
-                    # 如果無法轉換（例如不同磁碟機），則保留原路徑但仍正規化斜線
-                    logger.warning(f"無法將路徑 {path} 轉換為相對路徑")
-                    normalized_path = normalize_path(path)
+            if _isabs(path):
+                normalized_path = normalize_path(path)
+                if normalized_path.startswith(root_prefix):
+                    # 常見情況：路徑就在專案根目錄下
+                    normalized_path = normalized_path[len(root_prefix):]
+                else:
+                    try:
+                        # 嘗試將絕對路徑轉換為相對於專案根目錄的路徑
+                        normalized_path = normalize_path(os.path.relpath(path, root))
+                    except ValueError:
+                        # 如果無法轉換（例如不同磁碟機），則保留原路徑但仍正規化斜線
+                        logger.warning("無法將路徑 %s 轉換為相對路徑", path)
             else:
                 # 已經是相對路徑，只需正規化斜線
                 normalized_path = normalize_path(path)
             
-            normalized_data['dataset'][normalized_path] = labels
-        
+            # 內部使用 set，序列化時轉回排序後的 list
+            normalized_data['dataset'][normalized_path] = sorted(labels)
+
         # 確保目錄存在
         os.makedirs(os.path.dirname(yaml_file), exist_ok=True)
         
         # 保存新的資料集
         with open(yaml_file, 'w', encoding='utf-8') as f:
-            yaml.dump(normalized_data, f, indent=2, allow_unicode=True)
-        
+            yaml.dump(normalized_data, f, Dumper=YamlDumper, indent=2, allow_unicode=True)
+
+        # YAML 已更新，舊的 JSON 快取作廢，下次載入時重建
+        cache_file = _dataset_cache_file(yaml_file)
+        if os.path.exists(cache_file):
+            try:
+                os.remove(cache_file)
+            except OSError as e:
+                logger.warning("移除資料集快取失敗: %s", e)
+
         logger.info("儲存完成！")
         return True
     except Exception as e:
-        logger.error(f"儲存資料集失敗: {e}")
+        logger.error("儲存資料集失敗: %s", e)
         return False
 
 def clean_dataset(yaml_file, data, project_root):
@@ -168,18 +242,20 @@ def clean_dataset(yaml_file, data, project_root):
     
     # 獲取所有路徑的標準形式（絕對路徑）
     path_mapping = {}  # 原始路徑 -> 標準路徑
-    
+    _isabs = os.path.isabs  # 迴圈內避免重複屬性查找
+    root = normalize_path(os.path.abspath(project_root))  # 根目錄只展開一次
+
     for path in data['dataset']:
         # 如果是相對路徑，轉換為絕對路徑
-        if not os.path.isabs(path):
-            abs_path = normalize_path(os.path.abspath(os.path.join(project_root, path)))
+        if not _isabs(path):
+            abs_path = normalize_path(os.path.normpath(root + '/' + path))
         else:
             abs_path = normalize_path(path)
         
         # 檢查是否已經有相同的標準路徑
         if abs_path in unique_paths:
             duplicates.append(path)
-            logger.debug(f"發現重複路徑: {path}")
+            logger.debug("發現重複路徑: %s", path)
         else:
             unique_paths.add(abs_path)
             path_mapping[path] = abs_path
@@ -195,39 +271,49 @@ def clean_dataset(yaml_file, data, project_root):
             cleaned_data['dataset'][path] = labels
     
     # 報告清理結果
-    logger.info(f"清理了 {len(duplicates)} 個重複的路徑條目")
+    logger.info("清理了 %s 個重複的路徑條目", len(duplicates))
     
     return True, cleaned_data
 
+# 支援的圖片副檔名（不含點），供 get_image_list 快速過濾
+IMAGE_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.bmp', '.tiff'})
+
 def get_image_list(folder_path):
     """獲取指定文件夾中的所有圖片文件路徑"""
-    logger.info(f"獲取圖片列表: {folder_path}")
-    
-    image_extensions = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff')
+    logger.info("獲取圖片列表: %s", folder_path)
+
     image_paths = []
-    
+
     try:
         if os.path.exists(folder_path):
-            # 使用絕對路徑以確保程式內部操作一致性
-            images = [
-                normalize_path(os.path.abspath(os.path.join(folder_path, f)))
-                for f in os.listdir(folder_path) 
-                if f.lower().endswith(image_extensions)
-            ]
-            
-            # 排序保證順序一致
-            image_paths = sorted(images)
+            # 資料夾先展開成絕對路徑，DirEntry.path 就直接是絕對路徑，
+            # 迴圈內不必再對每個項目呼叫 abspath（每次都會 getcwd）
+            folder_abs = os.path.abspath(folder_path)
+
+            # 使用 scandir 避免對每個項目額外 stat
+            with os.scandir(folder_abs) as it:
+                images = [
+                    normalize_path(entry.path)
+                    for entry in it
+                    if entry.is_file(follow_symlinks=False)
+                    # splitext 沒有點時回傳空字串，名為 jpg 的無副檔名檔案不會被當成圖片
+                    and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+                ]
+
+            # 以完整路徑原地排序保證順序一致
+            images.sort()
+            image_paths = images
             
-            logger.info(f"找到 {len(image_paths)} 張圖片")
+            logger.info("找到 %s 張圖片", len(image_paths))
             
             # 記錄一些路徑示例，用於調試
             if image_paths:
-                logger.debug(f"圖片路徑示例: {image_paths[0]}")
+                logger.debug("圖片路徑示例: %s", image_paths[0])
                 if len(image_paths) > 1:
-                    logger.debug(f"圖片路徑示例2: {image_paths[1]}")
+                    logger.debug("圖片路徑示例2: %s", image_paths[1])
         else:
-            logger.error(f"文件夾不存在: {folder_path}")
+            logger.error("文件夾不存在: %s", folder_path)
     except Exception as e:
-        logger.error(f"獲取圖片列表時發生錯誤: {e}")
+        logger.error("獲取圖片列表時發生錯誤: %s", e)
     
     return image_paths 
\ No newline at end of file
@@ -1,22 +1,64 @@
 import os
 import time
+import hashlib
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from PyQt5.QtCore import QThread, pyqtSignal, QObject
 from PyQt5.QtGui import QImage
 from PIL import Image
-import numpy as np
 
 from .logger import get_logger
+from .constants import WORKING_DIR
 
 # 獲取當前模組的 logger
 logger = get_logger('image_loader')
 
+# 縮圖磁碟快取：重啟後不必重新解碼整個資料夾
+THUMB_CACHE_DIR = os.path.join(WORKING_DIR, "cache", "thumbs")
+THUMB_CACHE_MAX_FILES = 5000  # 超過時淘汰最久未使用的快取檔
+
+# 載入結果只餵給 150px 的縮略圖格子，直接在 worker 縮到顯示尺寸，
+# 主線程只剩 QPixmap.fromImage（必須留在 GUI 線程的那一步）
+THUMB_TARGET = (150, 150)
+
+def _thumb_cache_path(path, size):
+    """以 (路徑, mtime, 目標尺寸) 雜湊出縮圖快取檔路徑，來源更新即自動失效"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    digest = hashlib.blake2b(
+        f"{path}|{mtime}|{size}".encode('utf-8')).hexdigest()[:16]
+    return os.path.join(THUMB_CACHE_DIR, digest + '.png')
+
+def _prune_thumb_cache():
+    """快取檔數量超限時，依存取時間淘汰最舊的項目"""
+    try:
+        with os.scandir(THUMB_CACHE_DIR) as it:
+            entries = [(entry.stat().st_atime, entry.path)
+                       for entry in it if entry.is_file()]
+        if len(entries) <= THUMB_CACHE_MAX_FILES:
+            return
+        entries.sort()
+        for _, stale_path in entries[:len(entries) - THUMB_CACHE_MAX_FILES]:
+            os.remove(stale_path)
+        logger.debug("已清理 %s 個縮圖快取檔", len(entries) - THUMB_CACHE_MAX_FILES)
+    except OSError as e:
+        logger.warning("清理縮圖快取失敗: %s", e)
+
 class ImageLoader(QThread):
-    """圖片加載線程，用於後台載入和處理圖片"""
-    image_loaded = pyqtSignal(str, object)  # 圖片路徑和 QImage 對象
+    """圖片加載線程，用於後台載入和處理圖片
+
+    本身仍是一條 QThread（維持 isRunning/wait/terminate 的呼叫介面），
+    但 run() 內部把解碼工作切成小批次丟進線程池並行處理，
+    多核機器上解碼吞吐量約隨核心數線性提升。
+    """
+    image_batch_loaded = pyqtSignal(list)  # 一批 (圖片路徑, QImage) 元組
     progress_updated = pyqtSignal(int, int)  # 當前進度和總數
     loading_finished = pyqtSignal()  # 加載完成信號
-    
+
+    CHUNK_SIZE = 16  # 每個批次的圖片數，攤平任務提交開銷
+
     def __init__(self, all_paths, priority_paths=None):
         """
         初始化圖片加載線程
@@ -34,7 +76,7 @@ class ImageLoader(QThread):
         # 使用較低的線程優先級，以避免阻塞主線程
         self.setPriority(QThread.LowPriority)
         
-        logger.debug(f"初始化圖片加載線程: {len(all_paths)} 張圖片，{len(priority_paths or [])} 張優先")
+        logger.debug("初始化圖片加載線程: %s 張圖片，%s 張優先", len(all_paths), len(priority_paths or []))
     
     def stop(self):
         """請求停止線程"""
@@ -42,73 +84,112 @@ class ImageLoader(QThread):
         logger.debug("請求停止加載線程")
     
     def run(self):
-        """運行線程"""
+        """運行線程：切批次並行解碼，於本線程統一發射信號"""
         # 重置停止標誌
         self._stop_requested.clear()
-        
+
         try:
             # 首先處理優先路徑
             priority_set = set(self.priority_paths)
             paths_to_load = list(self.priority_paths)  # 複製優先列表
-            
+
             # 添加其餘路徑
             for path in self.all_paths:
                 if path not in priority_set:
                     paths_to_load.append(path)
-            
+
             total = len(paths_to_load)
             loaded = 0
-            
+
             # 發送初始進度信號
             self.progress_updated.emit(loaded, total)
-            
-            # 開始加載
-            for path in paths_to_load:
-                # 檢查是否請求停止
-                if self._stop_requested.is_set():
-                    logger.info("加載線程收到停止請求")
-                    break
-                
-                try:
-                    # 延遲以避免佔用過多CPU
-                    self.msleep(1)  # 使用QThread的毫秒睡眠，更精確
-                    
-                    # 檢查路徑有效性
-                    if not path or not os.path.exists(path):
-                        logger.warning(f"圖片路徑無效: {path}")
-                        continue
-                    
-                    # 使用PIL加載圖片
-                    img = Image.open(path)
-                    # 縮小尺寸以減少內存使用
-                    img.thumbnail((800, 800), Image.LANCZOS)
-                    
-                    # 轉換為QImage
-                    qimage = self.pil_to_qimage(img)
-                    
-                    # 發射信號
-                    self.image_loaded.emit(path, qimage)
-                    
-                    # 更新進度
-                    loaded += 1
-                    if loaded % 5 == 0 or loaded == total:  # 每5張或最後一張時更新進度
-                        self.progress_updated.emit(loaded, total)
-                    
-                except Exception as e:
-                    logger.error(f"載入圖片時出錯 {path}: {e}")
-                
-                # 釋放資源，避免內存洩漏
-                img = None
-                qimage = None
-            
+
+            # 確保縮圖快取目錄存在，並在需要時淘汰舊快取
+            os.makedirs(THUMB_CACHE_DIR, exist_ok=True)
+            _prune_thumb_cache()
+
+            # 依提交順序切批次，優先圖片的批次會先被 worker 取走
+            chunks = [paths_to_load[i:i + self.CHUNK_SIZE]
+                      for i in range(0, total, self.CHUNK_SIZE)]
+
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                futures = [executor.submit(self._load_chunk, chunk)
+                           for chunk in chunks]
+
+                for future in as_completed(futures):
+                    if self._stop_requested.is_set():
+                        logger.info("加載線程收到停止請求")
+                        for pending in futures:
+                            pending.cancel()
+                        break
+
+                    # 整批一次發射：每批只跨線程 marshall 一次，
+                    # 而不是每張圖片各排一個 GUI 事件
+                    batch = future.result()
+                    if batch:
+                        self.image_batch_loaded.emit(batch)
+                        loaded += len(batch)
+
+                    self.progress_updated.emit(loaded, total)
+
             # 加載完成
-            logger.info(f"圖片加載完成: {loaded}/{total}")
+            logger.info("圖片加載完成: %s/%s", loaded, total)
             self.loading_finished.emit()
-            
+
         except Exception as e:
-            logger.error(f"圖片加載線程出錯: {e}")
+            logger.error("圖片加載線程出錯: %s", e)
             self.loading_finished.emit()  # 即使出錯也發送完成信號
-    
+
+    def _load_chunk(self, chunk):
+        """在線程池 worker 中解碼一個批次，回傳 (路徑, QImage) 列表"""
+        results = []
+        for path in chunk:
+            if self._stop_requested.is_set():
+                break
+
+            # 檢查路徑有效性
+            if not path or not os.path.exists(path):
+                logger.warning("圖片路徑無效: %s", path)
+                continue
+
+            # 先查磁碟快取：直接載入 PNG 縮圖遠快於重新解碼原圖
+            cache_path = _thumb_cache_path(path, THUMB_TARGET)
+            if cache_path and os.path.exists(cache_path):
+                # 在 worker 線程就轉成 QPixmap 原生格式，理由同 pil_to_qimage
+                qimage = QImage(cache_path).convertToFormat(
+                    QImage.Format_ARGB32_Premultiplied)
+                if not qimage.isNull():
+                    try:
+                        os.utime(cache_path)  # 更新存取時間供 LRU 淘汰
+                    except OSError:
+                        pass
+                    results.append((path, qimage))
+                    continue
+
+            try:
+                # 使用PIL加載圖片
+                img = Image.open(path)
+                # JPEG 可在 DCT 域先粗縮（1/2、1/4、1/8），解碼省好幾倍；
+                # 其他格式 draft 為 no-op
+                img.draft('RGB', (THUMB_TARGET[0] * 2, THUMB_TARGET[1] * 2))
+                # 直接縮到顯示尺寸，主線程不必再重採樣；BILINEAR 已足夠
+                img.thumbnail(THUMB_TARGET, Image.BILINEAR)
+
+                # QImage 可以在非 GUI 線程建立（QPixmap 不行）
+                qimage = self.pil_to_qimage(img)
+                results.append((path, qimage))
+
+                # 寫入磁碟快取；失敗只記錄，不影響這次載入
+                if cache_path:
+                    try:
+                        qimage.save(cache_path, 'PNG')
+                    except Exception as e:
+                        logger.debug("寫入縮圖快取失敗 %s: %s", cache_path, e)
+            except Exception as e:
+                logger.error("載入圖片時出錯 %s: %s", path, e)
+
+        return results
+
     @staticmethod
     def pil_to_qimage(pil_image):
         """
@@ -121,23 +202,23 @@ class ImageLoader(QThread):
             QImage: 轉換後的QImage對象
         """
         try:
-            # 確保圖片是RGB模式
-            if pil_image.mode != "RGB":
-                pil_image = pil_image.convert("RGB")
-            
-            # 轉換為numpy數組
-            img_data = np.array(pil_image)
-            height, width, channels = img_data.shape
-            
-            # 創建QImage
-            bytes_per_line = channels * width
-            qimg = QImage(img_data.data, width, height, bytes_per_line, QImage.Format_RGB888)
-            
-            return qimg
+            # 統一轉成 RGBA，避免經過 numpy 的額外複製
+            if pil_image.mode != "RGBA":
+                pil_image = pil_image.convert("RGBA")
+
+            width, height = pil_image.size
+            buf = pil_image.tobytes()
+
+            # QImage 先包裹 bytes 緩衝區（不複製），再一次轉成
+            # ARGB32_Premultiplied——QPixmap 的原生格式。轉換在
+            # worker 線程做一次，GUI 線程的 fromImage 就走 memcpy
+            # 快速路徑，不必逐像素展開
+            qimg = QImage(buf, width, height, width * 4, QImage.Format_RGBA8888)
+            return qimg.convertToFormat(QImage.Format_ARGB32_Premultiplied)
         except Exception as e:
-            logger.error(f"轉換PIL圖像到QImage時出錯: {e}")
+            logger.error("轉換PIL圖像到QImage時出錯: %s", e)
             # 返回一個1x1的空白QImage作為後備
-            return QImage(1, 1, QImage.Format_RGB888)
+            return QImage(1, 1, QImage.Format_ARGB32_Premultiplied)
 
 # 用於直接測試圖片載入器
 def load_image(image_path, size=None):
@@ -152,22 +233,26 @@ def load_image(image_path, size=None):
         PIL.Image: 載入的PIL Image對象
     """
     try:
-        logger.debug(f"直接載入圖片: {image_path}")
+        logger.debug("直接載入圖片: %s", image_path)
         
         # 使用PIL載入圖片
         img = Image.open(image_path)
-        
+
+        # 有目標尺寸時先用 draft 在解碼階段粗縮（僅 JPEG 有效，需在載入像素前呼叫）
+        if size:
+            img.draft('RGB', (size[0] * 2, size[1] * 2))
+
         # 確保圖片模式正確
         if img.mode not in ["RGB", "RGBA"]:
             img = img.convert("RGB")
-        
+
         # 如果需要調整大小
         if size:
             img.thumbnail(size)
         
         return img
     except Exception as e:
-        logger.error(f"直接載入圖片失敗 {image_path}: {e}")
+        logger.error("直接載入圖片失敗 %s: %s", image_path, e)
         
         # 創建錯誤圖像
         width, height = size or (100, 100)
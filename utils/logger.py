@@ -1,7 +1,9 @@
 import os
+import atexit
 import logging
+import queue
 import time
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 
 # 創建日誌目錄
 LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "logs")
@@ -26,6 +28,14 @@ file_handler.setFormatter(formatter)
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(formatter)
 
+# 日誌改為非同步寫出：呼叫端只把記錄丟進佇列，
+# 檔案與控制台 I/O 由背景監聽線程處理，不阻塞熱路徑
+_log_queue = queue.Queue(-1)
+_queue_handler = QueueHandler(_log_queue)
+_queue_listener = QueueListener(_log_queue, file_handler, console_handler)
+_queue_listener.start()
+atexit.register(_queue_listener.stop)
+
 # 全局日誌級別字典，方便外部設置
 LOG_LEVELS = {
     'DEBUG': logging.DEBUG,
@@ -52,10 +62,9 @@ def get_logger(name, level='INFO'):
     # 設置日誌級別
     logger.setLevel(LOG_LEVELS.get(level, logging.INFO))
     
-    # 避免重複添加處理器
+    # 避免重複添加處理器；只掛佇列處理器，實際輸出在背景線程
     if not logger.handlers:
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+        logger.addHandler(_queue_handler)
     
     # 避免日誌傳播到上層 logger
     logger.propagate = False
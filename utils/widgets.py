@@ -1,8 +1,9 @@
 import os
 from PyQt5.QtWidgets import (QWidget, QLabel, QVBoxLayout, QHBoxLayout, QPushButton, 
                            QSizePolicy, QProgressBar, QDialog, QApplication, QFrame)
-from PyQt5.QtGui import QPixmap, QImage, QPainter, QColor, QFont
-from PyQt5.QtCore import Qt, pyqtSignal, QSize, QRect
+from PyQt5.QtGui import (QPixmap, QImage, QPainter, QColor, QFont, QPixmapCache,
+                         QStaticText)
+from PyQt5.QtCore import Qt, pyqtSignal, QSize, QRect, QElapsedTimer, QTimer
 
 from .logger import get_logger
 from .constants import THUMBNAIL_SIZE, STYLES, WHITE_LIST
@@ -13,9 +14,50 @@ logger = get_logger('widgets')
 class ThumbnailWidget(QWidget):
     """
     縮略圖小部件，用於顯示圖片縮略圖和標籤
+
+    自行在 paintEvent 繪製縮圖與標籤文字，而不是掛一個
+    QVBoxLayout 加兩個 QLabel——上千張縮圖時每個子 QObject
+    與其 QSS 狀態都是記憶體與樣式引擎的負擔
     """
     clicked = pyqtSignal(str)  # 發射被點擊的圖片路徑
-    
+
+    # 錯誤占位圖以類別為單位共用，不必每次失敗都重畫一張
+    _error_pixmaps = {}
+
+    # 縮圖顯示區域（固定尺寸小部件內的座標）
+    _IMG_RECT = QRect(5, 3, 150, 150)
+
+    # 標籤文字只有三種顏色，繪製時直接取類別常數
+    _COLOR_BLUE = QColor(0, 0, 255)
+    _COLOR_RED = QColor(255, 0, 0)
+    _COLOR_GRAY = QColor(128, 128, 128)
+    _COLOR_BG = QColor(240, 240, 240)
+    _COLOR_BORDER = QColor(160, 160, 160)
+    _COLOR_FLASH = QColor(224, 224, 224)
+
+    # 標籤文字字型（10px，等同原本的 QSS），所有實例共用
+    _caption_font = None
+
+    @classmethod
+    def _error_pixmap(cls, color, text=None):
+        """取得指定顏色（與可選文字）的錯誤占位 QPixmap，懶建立並快取"""
+        key = (color, text)
+        pixmap = cls._error_pixmaps.get(key)
+        if pixmap is None:
+            # ARGB32_Premultiplied 是 QPixmap 的原生像素格式，
+            # fromImage 走 memcpy 快速路徑而非逐像素轉換
+            img = QImage(100, 100, QImage.Format_ARGB32_Premultiplied)
+            img.fill(QColor(*color))
+            if text:
+                painter = QPainter(img)
+                painter.setPen(QColor(0, 0, 0))
+                painter.setFont(QFont("Arial", 10))
+                painter.drawText(QRect(10, 10, 80, 80), Qt.AlignCenter, text)
+                painter.end()
+            pixmap = QPixmap.fromImage(img)
+            cls._error_pixmaps[key] = pixmap
+        return pixmap
+
     def __init__(self, img_path, parent=None):
         """
         初始化縮略圖小部件
@@ -26,58 +68,87 @@ class ThumbnailWidget(QWidget):
         """
         super().__init__(parent)
         self.img_path = img_path
+        # 檔名與其截斷版本不會變，建構時算一次
+        filename = os.path.basename(img_path)
+        if len(filename) > 15:
+            filename = filename[:12] + "..."
+        self._display_name = filename
         self.image_set = False
         self.labels = []
         self.error_state = False  # 追踪是否圖片顯示出錯
         self.target_class = None  # 目標類別
-        
+
+        # 繪製狀態：縮圖、標籤文字與顏色、點擊反饋
+        self._pixmap = None
+        self._caption = ""
+        self._caption_color = self._COLOR_GRAY
+        self._flash = False
+
+        # QStaticText 只排版一次字形，捲動網格重繪時直接貼上
+        self._static_caption = QStaticText()
+        self._static_caption.setPerformanceHint(QStaticText.AggressiveCaching)
+
+        if ThumbnailWidget._caption_font is None:
+            font = QFont()
+            font.setPixelSize(10)
+            ThumbnailWidget._caption_font = font
+
         # 設置固定大小
         self.setFixedSize(160, 180)
-        
-        # 佈局
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(3, 3, 3, 3)
-        
-        # 圖片標籤，用於顯示縮略圖
-        self.image_label = QLabel()
-        self.image_label.setAlignment(Qt.AlignCenter)
-        self.image_label.setFixedSize(150, 150)
-        self.image_label.setFrameShape(QFrame.Box)
-        self.image_label.setFrameShadow(QFrame.Sunken)
-        self.image_label.setLineWidth(1)
-        self.image_label.setStyleSheet("background-color: #f0f0f0;")
-        
-        # 標籤信息標籤
-        self.info_label = QLabel()
-        self.info_label.setAlignment(Qt.AlignCenter)
-        self.info_label.setMaximumHeight(20)
-        self.info_label.setStyleSheet("font-size: 10px;")
-        
-        # 添加到佈局
-        layout.addWidget(self.image_label)
-        layout.addWidget(self.info_label)
-        
-        # 顯示加載中文本
-        self.image_label.setText("加載中...")
-        
+
         # 處理點擊事件
         self.setCursor(Qt.PointingHandCursor)
-        
+
         # 設置標籤初始顯示
         self.update_label_display()
-        
+
         logger.debug(f"創建縮略圖小部件: {img_path}")
-        
+
+    def paintEvent(self, event):
+        """自行繪製縮圖、邊框與標籤文字"""
+        painter = QPainter(self)
+
+        # 點擊反饋：整個小部件短暫變灰
+        if self._flash:
+            painter.fillRect(self.rect(), self._COLOR_FLASH)
+
+        # 圖片區塊背景與邊框（取代原本 QLabel 的 QSS 與 QFrame）
+        painter.fillRect(self._IMG_RECT, self._COLOR_BG)
+        painter.setPen(self._COLOR_BORDER)
+        painter.drawRect(self._IMG_RECT)
+
+        if self._pixmap is not None and not self._pixmap.isNull():
+            # 縮圖已預先縮到顯示尺寸，置中畫上即可
+            x = self._IMG_RECT.x() + (self._IMG_RECT.width() - self._pixmap.width()) // 2
+            y = self._IMG_RECT.y() + (self._IMG_RECT.height() - self._pixmap.height()) // 2
+            painter.drawPixmap(x, y, self._pixmap)
+        else:
+            painter.setPen(QColor(51, 51, 51))
+            painter.drawText(self._IMG_RECT, Qt.AlignCenter, "加載中...")
+
+        # 標籤文字：drawStaticText 重用快取的字形排版
+        painter.setFont(self._caption_font)
+        painter.setPen(self._caption_color)
+        size = self._static_caption.size()
+        painter.drawStaticText(
+            int((self.width() - size.width()) / 2),
+            int(self.height() - 24 + (20 - size.height()) / 2),
+            self._static_caption)
+        painter.end()
+
     def mousePressEvent(self, event):
         """處理鼠標按下事件，發射點擊信號"""
         if event.button() == Qt.LeftButton:
             self.clicked.emit(self.img_path)
-            # 提供點擊反饋
-            self.setStyleSheet("background-color: #e0e0e0;")
-            QApplication.processEvents()  # 立即更新界面
-            # 短暫延遲後恢復樣式
-            QApplication.instance().processEvents()
-            self.setStyleSheet("")
+            # 提供點擊反饋：短暫變灰後恢復
+            self._flash = True
+            self.update()
+            QTimer.singleShot(120, self._end_flash)
+
+    def _end_flash(self):
+        """結束點擊反饋"""
+        self._flash = False
+        self.update()
     
     def set_image(self, qimage):
         """
@@ -91,55 +162,68 @@ class ThumbnailWidget(QWidget):
                 # 如果圖像為空，顯示錯誤指示
                 logger.warning(f"圖像無效: {self.img_path}")
                 self.error_state = True
-                error_img = QImage(100, 100, QImage.Format_RGB888)
-                error_img.fill(QColor(255, 200, 0))  # 黃色警告色
-                
-                # 在圖像上繪製錯誤標記
-                painter = QPainter(error_img)
-                painter.setPen(QColor(0, 0, 0))
-                painter.setFont(QFont("Arial", 10))
-                painter.drawText(QRect(10, 10, 80, 80), Qt.AlignCenter, "載入錯誤")
-                painter.end()
-                
-                self.image_label.setPixmap(QPixmap.fromImage(error_img))
+                self._pixmap = self._error_pixmap((255, 200, 0), "載入錯誤")  # 黃色警告色
+            elif qimage.width() <= 0 or qimage.height() <= 0:
+                # 無效圖像尺寸
+                logger.warning(f"圖像尺寸無效: {self.img_path} ({qimage.width()}x{qimage.height()})")
+                self.error_state = True
+                self._pixmap = self._error_pixmap((255, 100, 100))  # 警告紅色
             else:
-                # 檢查圖像的有效性
-                if qimage.width() <= 0 or qimage.height() <= 0:
-                    # 無效圖像尺寸
-                    logger.warning(f"圖像尺寸無效: {self.img_path} ({qimage.width()}x{qimage.height()})")
-                    self.error_state = True
-                    error_img = QImage(100, 100, QImage.Format_RGB888)
-                    error_img.fill(QColor(255, 100, 100))  # 警告紅色
-                    self.image_label.setPixmap(QPixmap.fromImage(error_img))
-                else:
-                    # 正常設置圖像
-                    logger.debug(f"正常設置圖像: {self.img_path}")
-                    self.error_state = False
-                    self.image_set = True
-                    pixmap = QPixmap.fromImage(qimage)
-                    # 縮放到合適大小
-                    pixmap = pixmap.scaled(
-                        self.image_label.width(), 
-                        self.image_label.height(),
-                        Qt.KeepAspectRatio, 
-                        Qt.SmoothTransformation
-                    )
-                    self.image_label.setPixmap(pixmap)
-            
-            # 如果之前有加載文本，現在清除
-            if not self.image_label.pixmap():
-                self.image_label.clear()
-            
-            # 更新標籤顯示
-            self.update_label_display()
+                # 正常設置圖像
+                logger.debug(f"正常設置圖像: {self.img_path}")
+                self.error_state = False
+                self.image_set = True
+
+                # 同一來源與尺寸的縮放結果存放在 QPixmapCache，
+                # 重建縮略圖網格時直接命中，不再重做轉換與重採樣。
+                # 縮到 150px 用 FastTransformation 就夠了，成本低數倍
+                target_w = self._IMG_RECT.width()
+                target_h = self._IMG_RECT.height()
+                key = self.cache_key(self.img_path)
+                pixmap = QPixmapCache.find(key)
+                if pixmap is None:
+                    if qimage.width() <= target_w and qimage.height() <= target_h:
+                        # 載入線程已縮到顯示尺寸，這裡只做 fromImage
+                        pixmap = QPixmap.fromImage(qimage)
+                    else:
+                        pixmap = QPixmap.fromImage(qimage).scaled(
+                            target_w,
+                            target_h,
+                            Qt.KeepAspectRatio,
+                            Qt.FastTransformation
+                        )
+                    QPixmapCache.insert(key, pixmap)
+                self._pixmap = pixmap
+
+            # 標籤文字不依賴圖片內容，這裡只需重繪
+            self.update()
         except Exception as e:
             logger.error(f"設置圖片時發生錯誤: {self.img_path}, {e}")
             # 如果設置失敗，顯示錯誤圖示
             self.error_state = True
-            error_img = QImage(100, 100, QImage.Format_RGB888)
-            error_img.fill(QColor(255, 0, 0))  # 紅色
-            self.image_label.setPixmap(QPixmap.fromImage(error_img))
+            self._pixmap = self._error_pixmap((255, 0, 0))  # 紅色
+            self.update()
     
+    @classmethod
+    def cache_key(cls, img_path):
+        """縮圖在 QPixmapCache 中的鍵，各視窗共用同一格式"""
+        return f"{img_path}|{cls._IMG_RECT.width()}x{cls._IMG_RECT.height()}"
+
+    def load_from_cache(self):
+        """嘗試從 QPixmapCache 取回縮圖，命中時直接顯示
+
+        Returns:
+            bool: 是否命中快取
+        """
+        pixmap = QPixmapCache.find(self.cache_key(self.img_path))
+        if pixmap is None:
+            return False
+        self.error_state = False
+        self.image_set = True
+        self._pixmap = pixmap
+        self.update()
+        return True
+
     def set_target_class(self, target_class):
         """
         設置目標類別
@@ -152,27 +236,31 @@ class ThumbnailWidget(QWidget):
     
     def update_label_display(self):
         """更新標籤顯示"""
-        # 獲取文件名
-        filename = os.path.basename(self.img_path)
-        
         # 如果有標籤，則顯示標籤
         if self.labels:
-            short_labels = str(self.labels)
+            short_labels = ", ".join(sorted(self.labels))
             if len(short_labels) > 25:
                 short_labels = short_labels[:22] + "..."
-            self.info_label.setText(short_labels)
-            
+            text = short_labels
+
             # 根據是否包含目標類別決定顏色
             if self.target_class and self.target_class in self.labels:
-                self.info_label.setStyleSheet("color: blue; font-size: 10px;")
+                color = self._COLOR_BLUE
             else:
-                self.info_label.setStyleSheet("color: red; font-size: 10px;")
+                color = self._COLOR_RED
         else:
-            # 如果沒有標籤，則顯示文件名
-            if len(filename) > 15:
-                filename = filename[:12] + "..."
-            self.info_label.setText(f"未標記: {filename}")
-            self.info_label.setStyleSheet("color: gray; font-size: 10px;")
+            # 如果沒有標籤，則顯示文件名（建構時已截斷）
+            text = f"未標記: {self._display_name}"
+            color = self._COLOR_GRAY
+
+        # 內容沒變就不重繪
+        if text != self._caption or color is not self._caption_color:
+            self._caption = text
+            self._caption_color = color
+            self._static_caption.setText(text)
+            # 先用實際字型排版好，首次繪製就不必現場計算
+            self._static_caption.prepare(font=self._caption_font)
+            self.update()
     
     def set_labels(self, labels):
         """
@@ -183,31 +271,40 @@ class ThumbnailWidget(QWidget):
         """
         self.labels = labels
         self.update_label_display()
-        
-    def resizeEvent(self, event):
-        """調整大小事件，重新縮放圖片"""
-        if self.image_label.pixmap() and not self.image_label.pixmap().isNull():
-            # 重新縮放圖片以適應新的大小
-            try:
-                self.image_label.setPixmap(self.image_label.pixmap().scaled(
-                    self.width(), self.height(),
-                    Qt.KeepAspectRatio, 
-                    Qt.SmoothTransformation
-                ))
-            except Exception as e:
-                logger.error(f"重新縮放圖片失敗: {e}")
-        super().resizeEvent(event)
 
 class LoadingDialog(QDialog):
     """載入進度對話框，用於顯示載入進度"""
     
     # 類級別變量，記錄當前是否有對話框打開
     _is_open = False
-    
+
+    # 對話框單例：重複開啟總覽時不必每次重建整棵 widget 樹
+    _singleton = None
+
     @classmethod
     def is_dialog_open(cls):
         """檢查是否已有加載對話框打開"""
         return cls._is_open
+
+    @classmethod
+    def instance(cls, parent=None):
+        """取得共用的載入對話框，第一次呼叫時才建構，之後重置重用"""
+        if cls._singleton is None:
+            cls._singleton = cls(parent)
+        else:
+            cls._singleton.reset()
+        return cls._singleton
+
+    def reset(self):
+        """歸零進度並還原初始文字，供單例重複使用"""
+        LoadingDialog._is_open = True
+        self.progress_bar.setMaximum(100)
+        self.progress_bar.setValue(0)
+        self.info_label.setText("正在索引圖片，請稍候...")
+        self.desc_label.setText("正在載入圖片資料，並為每張圖片生成縮略圖...")
+        self.cancel_button.setEnabled(False)
+        self._last_tick.restart()
+        self._last_percent = -1
     
     def __init__(self, parent=None):
         """
@@ -261,7 +358,12 @@ class LoadingDialog(QDialog):
         # 設置取消按鈕為不可用，避免用戶中斷載入
         # 註意：這可能導致用戶感覺應用程序卡死，請謹慎使用
         self.cancel_button.setEnabled(False)
-        
+
+        # 進度更新以時間節流（約 30Hz），避免每張圖片都 drain 一次事件佇列
+        self._last_tick = QElapsedTimer()
+        self._last_tick.start()
+        self._last_percent = -1
+
         logger.debug("創建載入對話框")
     
     def update_progress(self, current, total):
@@ -273,31 +375,41 @@ class LoadingDialog(QDialog):
             total (int): 總數
         """
         if total > 0:
+            # 節流：未滿 33ms 且尚未完成時跳過，processEvents 會同步
+            # 排空整個事件佇列（含重繪），每張圖片都呼叫會主導載入時間
+            if self._last_tick.elapsed() <= 33 and current != total:
+                return
+            self._last_tick.restart()
+
             # 設置進度條最大值
             self.progress_bar.setMaximum(total)
             self.progress_bar.setValue(current)
-            
+
             # 更新標籤
             percent = int((current / total) * 100)
             self.info_label.setText(f"圖片載入中... {percent}% ({current}/{total})")
-            
-            # 根據進度更新描述
-            if percent < 25:
-                self.desc_label.setText("正在載入圖片資料，這可能需要一些時間...")
-            elif percent < 50:
-                self.desc_label.setText("正在生成縮略圖，請耐心等待...")
-            elif percent < 75:
-                self.desc_label.setText("正在分析圖片標籤，即將完成...")
-            else:
-                self.desc_label.setText("即將完成，正在最終處理...")
-                
-                # 進度接近完成時，啟用取消按鈕
-                if percent > 90:
-                    self.cancel_button.setEnabled(True)
-            
+
+            # 百分比沒變時描述文字也不會變，跳過 setText
+            if percent != self._last_percent:
+                self._last_percent = percent
+
+                # 根據進度更新描述
+                if percent < 25:
+                    self.desc_label.setText("正在載入圖片資料，這可能需要一些時間...")
+                elif percent < 50:
+                    self.desc_label.setText("正在生成縮略圖，請耐心等待...")
+                elif percent < 75:
+                    self.desc_label.setText("正在分析圖片標籤，即將完成...")
+                else:
+                    self.desc_label.setText("即將完成，正在最終處理...")
+
+                    # 進度接近完成時，啟用取消按鈕
+                    if percent > 90:
+                        self.cancel_button.setEnabled(True)
+
             # 處理事件循環，確保界面更新
             QApplication.processEvents()
-        
+
         logger.debug(f"更新進度條: {current}/{total}")
     
     def closeEvent(self, event):
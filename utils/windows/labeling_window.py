@@ -1,8 +1,9 @@
 from PyQt5.QtWidgets import (QMainWindow, QLabel, QVBoxLayout, 
                         QHBoxLayout, QWidget, QGridLayout, QScrollArea,
                         QPushButton, QSizePolicy)
-from PyQt5.QtGui import QPixmap, QImage
-from PyQt5.QtCore import Qt, pyqtSignal, QTimer
+from PyQt5.QtGui import QPixmap, QImage, QPixmapCache
+from PyQt5.QtCore import (Qt, pyqtSignal, QTimer, QObject, QRunnable,
+                          QThreadPool)
 
 import os
 from PIL import Image
@@ -13,6 +14,41 @@ from ..image_loader import ImageLoader
 # 獲取當前模組的 logger
 logger = get_logger('labeling_window')
 
+class _ResizeTaskSignals(QObject):
+    """重採樣任務的信號載體（QRunnable 本身不能發信號）"""
+    # 世代編號、圖片路徑、寬、高、是否最終畫質、結果 QImage
+    done = pyqtSignal(int, str, int, int, bool, QImage)
+
+class _ResizeTask(QRunnable):
+    """線程池任務：在背景執行 PIL 重採樣與 QImage 轉換
+
+    只有 QImage 跨線程傳遞（QPixmap 僅限 GUI 線程建立）。
+    """
+
+    def __init__(self, signals, generation, img_path, source, size, resample):
+        super().__init__()
+        self.signals = signals
+        self.generation = generation
+        self.img_path = img_path
+        self.source = source
+        self.size = size
+        self.resample = resample
+        self.setAutoDelete(True)
+
+    def run(self):
+        try:
+            if self.size != self.source.size:
+                resized = self.source.resize(self.size, self.resample)
+            else:
+                resized = self.source
+            qimage = ImageLoader.pil_to_qimage(resized)
+        except Exception as e:
+            logger.error(f"背景重採樣失敗 {self.img_path}: {e}")
+            return
+        self.signals.done.emit(self.generation, self.img_path,
+                               self.size[0], self.size[1],
+                               self.resample == Image.LANCZOS, qimage)
+
 class LabelingWindow(QMainWindow):
     """標記視窗類，用於標記單張圖片"""
     labels_changed = pyqtSignal(str, list)  # 路徑和新標籤列表
@@ -54,6 +90,13 @@ class LabelingWindow(QMainWindow):
         self.labels_dict = labels_dict
         self.has_changes = False
         self.original_image = None  # 保存原始圖片以便於調整大小
+        self._display_master = None  # 顯示用中解析度母本，懶建立
+        self._last_rendered = None  # (路徑, 寬, 高, 是否LANCZOS)，避免重複渲染
+
+        # 背景重採樣：世代編號遞增，過期任務的結果直接丟棄
+        self._resize_signals = _ResizeTaskSignals()
+        self._resize_signals.done.connect(self._on_resize_done)
+        self._render_generation = 0
         
         # 保存所有圖片路徑和當前索引，以便導航
         self.all_image_paths = all_image_paths or []
@@ -90,6 +133,7 @@ class LabelingWindow(QMainWindow):
         # 加載圖片
         try:
             self.original_image = Image.open(img_path)
+            self._display_master = None  # 換圖後母本作廢
             self.update_image_display()
         except Exception as e:
             logger.error(f"無法載入圖片: {e}")
@@ -104,16 +148,17 @@ class LabelingWindow(QMainWindow):
         
         # 確保圖片路徑存在於資料集中
         if img_path not in data['dataset']:
-            data['dataset'][img_path] = []
+            data['dataset'][img_path] = set()
             logger.debug(f"在資料集中創建新路徑: {img_path}")
         
         for key, label in labels_dict.items():
             btn = QPushButton(f"{key}: {label}")
-            
-            # 檢查是否已有此標籤
-            if label in data['dataset'][img_path]:
-                btn.setStyleSheet("background-color: #a3c2c2;")
-            
+
+            # 以動態屬性走應用程式級 QSS（與主視窗的標籤按鈕一致），
+            # 切換狀態只需 polish，不必每次重新解析樣式字串
+            btn.setProperty("labelButton", True)
+            btn.setProperty("active", label in data['dataset'][img_path])
+
             btn.clicked.connect(lambda checked, lbl=label: self.toggle_label(lbl))
             button_layout.addWidget(btn, row, col)
             self.label_buttons[label] = btn
@@ -157,18 +202,18 @@ class LabelingWindow(QMainWindow):
         
         # 先保存當前圖片的更改
         if self.has_changes:
-            current_labels = self.data['dataset'].get(self.img_path, [])
-            self.labels_changed.emit(self.img_path, current_labels)
+            current_labels = self.data['dataset'].get(self.img_path, set())
+            self.labels_changed.emit(self.img_path, sorted(current_labels))
             self.has_changes = False
-        
+
         # 更新數據和路徑
         self.img_path = img_path
         self.data = data
         self.labels_dict = labels_dict
-        
+
         # 確保圖片路徑存在於資料集中
         if img_path not in self.data['dataset']:
-            self.data['dataset'][img_path] = []
+            self.data['dataset'][img_path] = set()
             logger.debug(f"在資料集中創建新路徑: {img_path}")
         
         # 更新視窗標題
@@ -192,23 +237,37 @@ class LabelingWindow(QMainWindow):
         # 加載新圖片
         try:
             self.original_image = Image.open(img_path)
+            self._display_master = None  # 換圖後母本作廢
             self.update_image_display()
         except Exception as e:
             logger.error(f"無法載入圖片: {e}")
             self.image_label.setText(f"無法載入圖片: {e}")
         
         # 更新按鈕狀態
+        current_labels = self.data['dataset'][img_path]
         for label, btn in self.label_buttons.items():
-            if label in self.data['dataset'][img_path]:
-                btn.setStyleSheet("background-color: #a3c2c2;")
-            else:
-                btn.setStyleSheet("")
-        
+            self._set_button_active(btn, label in current_labels)
+
         # 更新標籤顯示
         self.update_label_display()
-    
-    def update_image_display(self):
-        """根據視窗大小更新圖片顯示"""
+
+    @staticmethod
+    def _set_button_active(btn, active):
+        """切換按鈕的 active 屬性；狀態沒變就不觸發重新 polish"""
+        if bool(btn.property("active")) == active:
+            return
+        btn.setProperty("active", active)
+        btn.style().unpolish(btn)
+        btn.style().polish(btn)
+
+    def update_image_display(self, resample=Image.LANCZOS):
+        """根據視窗大小更新圖片顯示
+
+        Parameters:
+            resample: PIL 重採樣濾波器；拖曳調整大小的過渡幀用
+                BILINEAR（成本只有 LANCZOS 的幾分之一），停止後
+                再以預設的 LANCZOS 出最終畫質
+        """
         if self.original_image is None:
             return
             
@@ -228,40 +287,124 @@ class LabelingWindow(QMainWindow):
             
             # 使用較小的比例，確保完整顯示圖片
             scale_ratio = min(width_ratio, height_ratio)
-            
-            # 計算新尺寸
-            new_width = int(orig_width * scale_ratio)
-            new_height = int(orig_height * scale_ratio)
+
+            # 比例幾乎為 1（視窗恰好貼合圖片）時直接用原尺寸，
+            # 免得浮點抖動算出差一兩像素的目標而觸發整趟重採樣
+            if abs(scale_ratio - 1.0) < 0.01:
+                new_width, new_height = orig_width, orig_height
+            else:
+                # 計算新尺寸
+                new_width = int(orig_width * scale_ratio)
+                new_height = int(orig_height * scale_ratio)
             
             # 確保至少有最小尺寸
             new_width = max(new_width, 100)
             new_height = max(new_height, 100)
             
-            # 調整圖片大小（不論放大還是縮小）
-            if new_width != orig_width or new_height != orig_height:
-                resized_img = self.original_image.resize((new_width, new_height), Image.LANCZOS)
-            else:
-                resized_img = self.original_image
-            
-            # 轉換為QPixmap並顯示
-            qimg = ImageLoader.pil_to_qimage(resized_img)
-            pixmap = QPixmap.fromImage(qimg)
-            self.image_label.setPixmap(pixmap)
-            
-            logger.debug(f"圖片已調整大小並顯示: {new_width}x{new_height}")
-    
+            # 拖離再拖回同一尺寸等情況：畫面上已經是這個（路徑, 尺寸）
+            # 的成品就直接返回——已是最終畫質時任何重渲染都多餘，
+            # 過渡幀也沒必要以同尺寸重出一次
+            if self._last_rendered is not None:
+                last_path, last_w, last_h, last_final = self._last_rendered
+                if (last_path == self.img_path and last_w == new_width
+                        and last_h == new_height
+                        and (last_final or resample != Image.LANCZOS)):
+                    return
+
+            # 同一路徑與尺寸的結果存放在 QPixmapCache（鍵格式與縮略圖
+            # 一致），翻頁回到看過的圖片時直接命中，整條 LANCZOS 重採樣
+            # 加 PIL→QImage 轉換都省下來
+            key = f"{self.img_path}|{new_width}x{new_height}"
+            pixmap = QPixmapCache.find(key)
+            if pixmap is not None:
+                self.image_label.setPixmap(pixmap)
+                self._last_rendered = (self.img_path, new_width, new_height, True)
+                logger.debug(f"圖片快取命中並顯示: {new_width}x{new_height}")
+                return
+
+            # 從中解析度母本重採樣：每次 resize 的 LANCZOS 輸入比
+            # 整張原圖小一個數量級；目標超過母本尺寸時退回原圖
+            source = self._get_display_master()
+            if new_width > source.size[0] or new_height > source.size[1]:
+                source = self.original_image
+                # 惰性載入在 GUI 線程完成；PIL 的 lazy load 不是線程
+                # 安全的，不能讓多個 worker 同時對同一物件觸發解碼
+                source.load()
+
+            # 重採樣與 QImage 轉換丟給線程池，GUI 線程不被卡住；
+            # 畫面暫時保留上一張成品，結果回來再換上
+            self._render_generation += 1
+            task = _ResizeTask(self._resize_signals, self._render_generation,
+                               self.img_path, source,
+                               (new_width, new_height), resample)
+            QThreadPool.globalInstance().start(task)
+
+    def _on_resize_done(self, generation, img_path, width, height, is_final, qimage):
+        """背景重採樣完成；過期（使用者又改了尺寸或換圖）的結果丟棄"""
+        if generation != self._render_generation or img_path != self.img_path:
+            return
+
+        pixmap = QPixmap.fromImage(qimage)
+        if is_final:
+            # 過渡幀畫質較低，不放進快取
+            QPixmapCache.insert(f"{img_path}|{width}x{height}", pixmap)
+        self.image_label.setPixmap(pixmap)
+        self._last_rendered = (img_path, width, height, is_final)
+
+        logger.debug(f"圖片已調整大小並顯示: {width}x{height}")
+
+    # 顯示母本的上限尺寸；視窗極少超過這個大小
+    _MASTER_SIZE = (2048, 2048)
+
+    def _get_display_master(self):
+        """取得顯示用中解析度母本，首次使用時從原圖建立
+
+        JPEG 先用 draft 在解碼階段粗縮（IDCT 1/2、1/4、1/8），
+        再以一次 LANCZOS 縮到 2048 以內；之後的每個 resize tick
+        都從母本而不是全解析度原圖重採樣。
+
+        母本順帶轉成 RGBA：之後每次 resize 重採樣出來的就已經是
+        pil_to_qimage 期望的模式，模式轉換每張圖只做一次，
+        不再攤在每個 resize tick 上。
+        """
+        if self._display_master is None:
+            master = self.original_image
+            master.draft('RGB', self._MASTER_SIZE)
+            if master.size[0] > self._MASTER_SIZE[0] or master.size[1] > self._MASTER_SIZE[1]:
+                master = master.copy()
+                master.thumbnail(self._MASTER_SIZE, Image.LANCZOS)
+            if master.mode != "RGBA":
+                master = master.convert("RGBA")
+            # 原圖已是 RGBA 且不需縮小時，master 可能仍是惰性未解碼
+            # 狀態；PIL 的 lazy load 不是線程安全的，先在 GUI 線程
+            # 解碼完畢再交給線程池（已載入時 load() 是 no-op）
+            master.load()
+            self._display_master = master
+        return self._display_master
+
+    def _update_display_fast(self):
+        """拖曳期間的過渡幀：BILINEAR 快速重採樣"""
+        self.update_image_display(Image.BILINEAR)
+
     def resizeEvent(self, event):
         """處理視窗大小變化事件"""
         super().resizeEvent(event)
-        # 使用延遲更新避免頻繁重繪
+        # 兩段式延遲更新：拖曳中以 BILINEAR 快速跟上，
+        # 停止拖曳後再以 LANCZOS 出最終畫質（命中快取時免重算）
         if hasattr(self, '_resize_timer'):
             self._resize_timer.stop()
+            self._settle_timer.stop()
         else:
             self._resize_timer = QTimer()
             self._resize_timer.setSingleShot(True)
-            self._resize_timer.timeout.connect(self.update_image_display)
-        
-        self._resize_timer.start(150)  # 150毫秒延遲
+            self._resize_timer.timeout.connect(self._update_display_fast)
+
+            self._settle_timer = QTimer()
+            self._settle_timer.setSingleShot(True)
+            self._settle_timer.timeout.connect(self.update_image_display)
+
+        self._resize_timer.start(30)  # 過渡幀
+        self._settle_timer.start(200)  # 最終畫質
     
     def setup_shortcuts(self):
         """設置鍵盤快捷鍵"""
@@ -312,33 +455,32 @@ class LabelingWindow(QMainWindow):
         """切換到新圖片"""
         # 先保存當前圖片的更改
         if self.has_changes:
-            current_labels = self.data['dataset'].get(self.img_path, [])
-            self.labels_changed.emit(self.img_path, current_labels)
+            current_labels = self.data['dataset'].get(self.img_path, set())
+            self.labels_changed.emit(self.img_path, sorted(current_labels))
             self.has_changes = False
-        
+
         # 更新路徑和窗口標題
         self.img_path = new_img_path
         self.setWindowTitle(f"標記視窗 - {os.path.basename(new_img_path)}")
-        
+
         # 確保新圖片路徑存在於資料集中
         if new_img_path not in self.data['dataset']:
-            self.data['dataset'][new_img_path] = []
+            self.data['dataset'][new_img_path] = set()
             logger.debug(f"在資料集中創建新路徑: {new_img_path}")
         
         # 載入新圖片
         try:
             self.original_image = Image.open(new_img_path)
+            self._display_master = None  # 換圖後母本作廢
             self.update_image_display()
         except Exception as e:
             logger.error(f"無法載入圖片: {e}")
             self.image_label.setText(f"無法載入圖片: {e}")
         
         # 更新按鈕狀態
+        current_labels = self.data['dataset'][new_img_path]
         for label, btn in self.label_buttons.items():
-            if label in self.data['dataset'][new_img_path]:
-                btn.setStyleSheet("background-color: #a3c2c2;")
-            else:
-                btn.setStyleSheet("")
+            self._set_button_active(btn, label in current_labels)
         
         # 更新標籤顯示
         self.update_label_display()
@@ -394,18 +536,18 @@ class LabelingWindow(QMainWindow):
         
         # 確保目前路徑存在於資料集中
         if current_path not in self.data['dataset']:
-            self.data['dataset'][current_path] = []
+            self.data['dataset'][current_path] = set()
             logger.debug(f"在資料集中創建新路徑: {current_path}")
-        
+
         # 切換標籤
         if label in self.data['dataset'][current_path]:
-            self.data['dataset'][current_path].remove(label)
+            self.data['dataset'][current_path].discard(label)
             logger.debug(f"移除標籤: {label}")
-            self.label_buttons[label].setStyleSheet("")
+            self._set_button_active(self.label_buttons[label], False)
         else:
-            self.data['dataset'][current_path].append(label)
+            self.data['dataset'][current_path].add(label)
             logger.debug(f"添加標籤: {label}")
-            self.label_buttons[label].setStyleSheet("background-color: #a3c2c2;")
+            self._set_button_active(self.label_buttons[label], True)
         
         # 更新標籤顯示
         self.update_label_display()
@@ -414,11 +556,11 @@ class LabelingWindow(QMainWindow):
     def clear_labels(self):
         """清除所有標籤"""
         if self.img_path in self.data['dataset']:
-            self.data['dataset'][self.img_path] = []
+            self.data['dataset'][self.img_path] = set()
             
             # 更新按鈕樣式
             for btn in self.label_buttons.values():
-                btn.setStyleSheet("")
+                self._set_button_active(btn, False)
             
             self.update_label_display()
             self.has_changes = True
@@ -426,13 +568,13 @@ class LabelingWindow(QMainWindow):
     
     def update_label_display(self):
         """更新標籤顯示"""
-        current_labels = self.data['dataset'].get(self.img_path, [])
-        self.label_info.setText(f"當前標籤: {current_labels}")
+        current_labels = self.data['dataset'].get(self.img_path, set())
+        self.label_info.setText(f"當前標籤: {sorted(current_labels)}")
     
     def closeEvent(self, event):
         """窗口關閉事件"""
         if self.has_changes:
-            current_labels = self.data['dataset'].get(self.img_path, [])
-            self.labels_changed.emit(self.img_path, current_labels)
+            current_labels = self.data['dataset'].get(self.img_path, set())
+            self.labels_changed.emit(self.img_path, sorted(current_labels))
         event.accept()
         logger.debug("標記視窗已關閉") 
\ No newline at end of file
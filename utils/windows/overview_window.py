@@ -4,7 +4,7 @@ import time
 from PyQt5.QtWidgets import (QMainWindow, QLabel, QVBoxLayout, 
                             QHBoxLayout, QWidget, QGridLayout, QScrollArea,
                             QPushButton, QApplication)
-from PyQt5.QtGui import QPixmap, QImage
+from PyQt5.QtGui import QPixmap, QImage, QPixmapCache
 from PyQt5.QtCore import Qt, pyqtSignal, QTimer
 
 from ..logger import get_logger
@@ -15,6 +15,9 @@ from ..constants import WHITE_LIST, MAX_IMAGES
 # 獲取當前模組的 logger
 logger = get_logger('overview_window')
 
+# 白名單查詢集合：isdisjoint 在 C 層短路，分類熱迴圈不必逐標籤查表
+_WL = frozenset(WHITE_LIST)
+
 class OverviewWindow(QMainWindow):
     """總覽視窗類，用於顯示所有圖片的標籤總覽"""
     view_image = pyqtSignal(str)  # 發射被選中查看的圖片路徑
@@ -55,9 +58,22 @@ class OverviewWindow(QMainWindow):
         """初始化UI元素，只在第一次創建實例時調用"""
         self.all_image_paths = []
         self.data = {}
-        self.image_cache = {}  # 圖片緩存
         self.thumbnail_widgets = {}  # 縮略圖小部件緩存
-        
+        self._retired_loaders = []  # 已退役但尚未跑完的載入線程
+
+        # 進度文字以固定頻率合併刷新，UI 更新次數與圖片數脫鉤
+        self._progress = None  # 最新的 (loaded, total)，尚未刷新
+        self._progress_timer = QTimer(self)
+        self._progress_timer.setInterval(100)
+        self._progress_timer.timeout.connect(self._flush_progress)
+
+        # 方向鍵導航去抖：按住連發只在停下後重建一次視圖
+        self._pending_index = None
+        self._nav_timer = QTimer(self)
+        self._nav_timer.setSingleShot(True)
+        self._nav_timer.setInterval(120)
+        self._nav_timer.timeout.connect(self._apply_pending_view)
+
         # 添加鎖以防止並發更新
         self.update_lock = threading.Lock()
         self.is_updating = False
@@ -72,9 +88,15 @@ class OverviewWindow(QMainWindow):
         
         # 初始化標籤和特殊標籤
         self.all_labels = []
+        self._all_labels_set = set()
         self.special_labels = ["NOT IN WHITELIST", "WHITELIST"]
         self.label_images = {}
         self.label_counts = {}
+
+        # 目前網格實際呈現的視圖索引與其是否過期；
+        # 視圖沒變且內容沒髒時 update_view 可以整個略過重建
+        self._built_view_index = None
+        self._built_view_dirty = True
         
         # 顯示模式選擇
         mode_layout = QHBoxLayout()
@@ -114,36 +136,19 @@ class OverviewWindow(QMainWindow):
         
         self.scroll_area.setWidget(self.grid_widget)
         main_layout.addWidget(self.scroll_area)
+
+        # 懶建立縮略圖：網格先只記下 (row, col) -> 路徑，
+        # 捲動時才為進入視口的格子實際建立 ThumbnailWidget
+        self._pending_cells = {}
+        self.scroll_area.verticalScrollBar().valueChanged.connect(
+            self._materialize_visible)
         
         # 狀態欄
         self.statusBar().showMessage("準備就緒")
         
         # 設置鍵盤快捷鍵
         self.setup_shortcuts()
-        
-        # 確保信號連接正常
-        # 這一步是關鍵，確保信號連接只發生一次
-        self._ensure_signal_connections()
-        
-    def _ensure_signal_connections(self):
-        """確保所有信號連接都正確建立"""
-        logger.debug("確保信號連接正確建立")
-        
-        # 確保縮略圖的點擊信號正確連接
-        for img_path, thumbnail in self.thumbnail_widgets.items():
-            if thumbnail is not None:
-                try:
-                    # 先斷開舊的連接
-                    thumbnail.clicked.disconnect()
-                except:
-                    pass  # 如果未連接，則忽略錯誤
-                
-                # 重新連接信號
-                thumbnail.clicked.connect(self.on_thumbnail_clicked)
-                logger.debug(f"重新連接縮略圖信號: {img_path}")
-        
-        # 在這裡可以添加其他需要確保連接的信號
-        
+
     def on_thumbnail_clicked(self, img_path):
         """當縮略圖被點擊時調用"""
         # 增加日誌來調試點擊事件
@@ -166,60 +171,21 @@ class OverviewWindow(QMainWindow):
         self.all_image_paths = all_image_paths
         self.data = data
         
-        # 重新計算標籤分類
-        self.all_labels = set()
+        # 重新收集所有出現過的標籤，排序後 None（無標籤類別）固定放最前
+        labels_seen = set()
         for labels_list in data['dataset'].values():
-            if not labels_list:
-                self.all_labels.add("None")
-            else:
-                self.all_labels.update(labels_list)
-        
-        self.all_labels.add("None")  # 確保有無標籤類別
-        
-        # 轉換為排序列表，None放在最前
-        self.all_labels = sorted(list(self.all_labels))
-        if "None" in self.all_labels:
-            self.all_labels.remove("None")
-            self.all_labels = ["None"] + self.all_labels
-        
-        # 更新圖片分類
-        self.label_images = {label: [] for label in self.all_labels}
-        for label in self.special_labels:
-            self.label_images[label] = []
-        
-        # 重新處理圖片分類
-        all_image_paths_set = set(all_image_paths)
-        dataset_paths_set = set(data['dataset'].keys())
-        
-        unlabeled_paths = all_image_paths_set - dataset_paths_set
-        for path in unlabeled_paths:
-            self.label_images["None"].append(path)
-        
-        for path, labels_list in data['dataset'].items():
-            if not labels_list:
-                self.label_images["None"].append(path)
-            else:
-                for label in labels_list:
-                    if label in self.all_labels:
-                        self.label_images[label].append(path)
-                
-                if any(label in WHITE_LIST for label in labels_list):
-                    self.label_images["WHITELIST"].append(path)
-                elif labels_list:
-                    no_whitelist = True
-                    for label in labels_list:
-                        if label in WHITE_LIST:
-                            no_whitelist = False
-                            break
-                    if no_whitelist:
-                        self.label_images["NOT IN WHITELIST"].append(path)
-        
-        # 更新計數
-        self.label_counts = {label: len(imgs) for label, imgs in self.label_images.items()}
-        
-        # 每次更新數據後，重新確保信號連接
-        self._ensure_signal_connections()
-        
+            labels_seen.update(labels_list)
+        labels_seen.discard("None")
+        self.all_labels = ["None"] + sorted(labels_seen)
+        # 列表供排序顯示；成員檢查走這個集合，避免 O(標籤數) 線性掃描
+        self._all_labels_set = set(self.all_labels)
+        
+        # 資料整批換新，目前網格內容視為過期
+        self._built_view_dirty = True
+
+        # 更新圖片分類與計數
+        self._rebuild_label_index()
+
         # 更新顯示
         self.update_view()
         
@@ -248,16 +214,41 @@ class OverviewWindow(QMainWindow):
         right_action.triggered.connect(self.next_view)
         self.addAction(right_action)
     
+    def _retire_loader(self):
+        """要求現行載入線程收工，不阻塞等待
+
+        stop() 是協作式的（worker 逐批檢查停止旗標），這裡只斷開
+        信號、把線程掛進退役列表保持引用，待其自然結束後釋放；
+        不再 wait()/terminate()，切換視圖不會卡住 GUI，
+        也不冒強制終止讓程式崩潰的風險。
+        """
+        loader = getattr(self, 'loader_thread', None)
+        if loader is None or not loader.isRunning():
+            return
+        try:
+            loader.stop()
+            try:
+                loader.image_batch_loaded.disconnect()
+                loader.progress_updated.disconnect()
+                loader.loading_finished.disconnect()
+            except TypeError:
+                pass  # 忽略未連接的錯誤
+            self._retired_loaders.append(loader)
+            loader.finished.connect(self._release_retired_loader)
+        except Exception as e:
+            logger.error(f"停止之前的載入線程時出錯: {e}")
+
+    def _release_retired_loader(self):
+        """退役線程跑完後釋放引用"""
+        loader = self.sender()
+        if loader in self._retired_loaders:
+            self._retired_loaders.remove(loader)
+
     def start_image_loader(self):
         """啟動圖片預載入線程"""
-        # 確保之前的線程已停止
-        if hasattr(self, 'loader_thread') and self.loader_thread.isRunning():
-            try:
-                self.loader_thread.stop()
-                self.loader_thread.wait(200)  # 給足時間停止
-            except Exception as e:
-                logger.error(f"停止之前的載入線程時出錯: {e}")
-        
+        # 讓之前的線程協作式退役，不在這裡等它
+        self._retire_loader()
+
         # 收集當前視圖的所有圖片作為優先加載
         try:
             priority_paths = self.get_current_view_images()
@@ -272,20 +263,21 @@ class OverviewWindow(QMainWindow):
             
             # 先斷開所有可能的舊連接
             try:
-                self.loader_thread.image_loaded.disconnect()
+                self.loader_thread.image_batch_loaded.disconnect()
                 self.loader_thread.progress_updated.disconnect()
                 self.loader_thread.loading_finished.disconnect()
             except:
                 pass  # 忽略未連接的錯誤
             
             # 重新連接信號
-            self.loader_thread.image_loaded.connect(self.on_image_loaded)
+            self.loader_thread.image_batch_loaded.connect(self.on_image_batch_loaded)
             self.loader_thread.progress_updated.connect(self.on_progress_updated)
             self.loader_thread.loading_finished.connect(self.on_loading_finished)
             
-            # 啟動線程
+            # 啟動線程與進度刷新定時器
             self.loader_thread.start()
-            
+            self._progress_timer.start()
+
             # 更新狀態欄
             self.statusBar().showMessage(f"預載入 {len(priority_paths)} 張圖片")
             logger.info(f"開始載入圖片，優先載入 {len(priority_paths)} 張圖片")
@@ -297,21 +289,23 @@ class OverviewWindow(QMainWindow):
     def on_loading_finished(self):
         """當所有圖片加載完成時調用"""
         logger.info("圖片加載完成")
+        self._progress_timer.stop()
+        self._flush_progress()  # 把最後一筆進度刷出去
         self.statusBar().showMessage("所有圖片加載完成")
-        
-        # 這裡可以添加完成後的其他處理
-        from PyQt5.QtWidgets import QApplication
-        QApplication.processEvents()  # 確保界面更新
-    
+
     def on_progress_updated(self, loaded, total):
-        """當載入進度更新時調用"""
+        """當載入進度更新時調用（只記下最新值，由定時器統一刷新）"""
+        self._progress = (loaded, total)
+
+    def _flush_progress(self):
+        """以固定頻率把最新進度刷到 UI，期間沒有新值就不動"""
+        if self._progress is None:
+            return
+        loaded, total = self._progress
+        self._progress = None
         self.progress_label.setText(f"載入進度: {loaded}/{total}")
         self.statusBar().showMessage(f"載入進度: {loaded}/{total} 張圖片")
         logger.debug(f"圖片載入進度: {loaded}/{total}")
-        
-        # 處理事件循環，確保界面響應
-        from PyQt5.QtWidgets import QApplication
-        QApplication.processEvents()
     
     def get_current_view_images(self):
         """獲取當前視圖的所有圖片路徑列表"""
@@ -334,6 +328,15 @@ class OverviewWindow(QMainWindow):
         
         return current_images
     
+    def on_image_batch_loaded(self, batch):
+        """一次處理一批已載入的圖片，重繪合併成一個 paint 週期"""
+        self.setUpdatesEnabled(False)
+        try:
+            for path, qimage in batch:
+                self.on_image_loaded(path, qimage)
+        finally:
+            self.setUpdatesEnabled(True)
+
     def on_image_loaded(self, path, qimage):
         """當圖片載入完成時調用"""
         try:
@@ -342,34 +345,53 @@ class OverviewWindow(QMainWindow):
                 logger.warning(f"載入的圖片無效: {path}")
                 return
                 
-            # 保存到緩存
-            self.image_cache[path] = qimage
-            
-            # 更新縮略圖
-            if path in self.thumbnail_widgets and self.thumbnail_widgets[path] is not None:
+            # 更新縮略圖；set_image 會把結果存入應用級 QPixmapCache
+            widget = self.thumbnail_widgets.get(path)
+            if widget is not None:
                 try:
-                    self.thumbnail_widgets[path].set_image(qimage)
+                    widget.set_image(qimage)
                 except Exception as e:
                     logger.error(f"更新縮略圖時發生錯誤: {path}, {e}")
+            else:
+                # 格子尚未實體化：先以共用鍵存進 QPixmapCache，
+                # 之後建立小部件時直接命中；上限由 Qt 統一管理
+                key = ThumbnailWidget.cache_key(path)
+                if QPixmapCache.find(key) is None:
+                    QPixmapCache.insert(key, QPixmap.fromImage(qimage))
         except Exception as e:
             logger.error(f"處理已載入圖片時發生錯誤: {e}")
     
     def previous_view(self):
-        """切換到上一個檢視索引"""
-        if self.current_view_index > 0:
-            self.current_view_index -= 1
-            self.update_view()
-            self.scroll_area.verticalScrollBar().setValue(0)  # 回到頂部
-            logger.debug(f"切換到上一個檢視索引: {self.current_view_index}")
-    
+        """切換到上一個檢視索引（鍵盤連發時去抖合併成一次重建）"""
+        base = (self._pending_index if self._pending_index is not None
+                else self.current_view_index)
+        if base > 0:
+            self._pending_index = base - 1
+            self._nav_timer.start()
+            logger.debug(f"預定切換到檢視索引: {self._pending_index}")
+
     def next_view(self):
-        """切換到下一個檢視索引"""
+        """切換到下一個檢視索引（鍵盤連發時去抖合併成一次重建）"""
         max_index = len(self.all_labels) + len(self.special_labels)
-        if self.current_view_index < max_index:
-            self.current_view_index += 1
-            self.update_view()
-            self.scroll_area.verticalScrollBar().setValue(0)  # 回到頂部
-            logger.debug(f"切換到下一個檢視索引: {self.current_view_index}")
+        base = (self._pending_index if self._pending_index is not None
+                else self.current_view_index)
+        if base < max_index:
+            self._pending_index = base + 1
+            self._nav_timer.start()
+            logger.debug(f"預定切換到檢視索引: {self._pending_index}")
+
+    def _apply_pending_view(self):
+        """套用去抖後的目標檢視索引"""
+        if self._pending_index is None:
+            return
+        index = self._pending_index
+        self._pending_index = None
+        if index == self.current_view_index:
+            return
+        self.current_view_index = index
+        self.update_view()
+        self.scroll_area.verticalScrollBar().setValue(0)  # 回到頂部
+        logger.debug(f"切換到檢視索引: {index}")
     
     def update_view(self):
         """更新當前視圖"""
@@ -380,64 +402,57 @@ class OverviewWindow(QMainWindow):
             
         try:
             self.is_updating = True
-            
+
+            # 網格上已經是這個視圖而且內容沒變過，重建是純浪費
+            if (self.current_view_index == self._built_view_index
+                    and not self._built_view_dirty):
+                logger.debug(f"視圖 {self.current_view_index} 未變更，略過重建")
+                return
+
             # 保存當前滾動條位置
             scroll_position = self.scroll_area.verticalScrollBar().value()
             logger.debug(f"update_view 保存滾動條位置: {scroll_position}")
-            
-            # 處理事件，確保界面響應
-            from PyQt5.QtWidgets import QApplication
-            QApplication.processEvents()
-            
+
             # 清空現有網格
             self.clear_grid()
-            
-            # 更新界面標題
-            if self.current_view_index == 0:
-                # 顯示所有標籤
-                self.index_label.setText("目前檢視: 全部標籤")
-                # 先更新界面再繼續處理
-                QApplication.processEvents()
-                self.display_all_labels()
-            else:
-                # 顯示特定標籤
-                if self.current_view_index <= len(self.all_labels):
-                    label = self.all_labels[self.current_view_index - 1]
-                    self.index_label.setText(f"目前檢視: {label}")
-                    QApplication.processEvents()
-                    self.display_specific_label(label)
-                elif self.current_view_index <= len(self.all_labels) + len(self.special_labels):
-                    # 特殊標籤索引
-                    special_idx = self.current_view_index - len(self.all_labels) - 1
-                    label = self.special_labels[special_idx]
-                    self.index_label.setText(f"目前檢視: {label}")
-                    QApplication.processEvents()
-                    self.display_specific_label(label)
-                else:
-                    # 索引超出範圍，重置
-                    self.current_view_index = 0
+
+            # 重建期間關閉網格容器的重繪，數百個子部件各自觸發的
+            # 版面失效與 repaint 合併成結尾的一次重排
+            self.grid_widget.setUpdatesEnabled(False)
+            try:
+                # 更新界面標題
+                if self.current_view_index == 0:
+                    # 顯示所有標籤
                     self.index_label.setText("目前檢視: 全部標籤")
-                    QApplication.processEvents()
                     self.display_all_labels()
-            
-            # 確保界面更新
-            QApplication.processEvents()
-            
-            # 更新優先載入的圖片
-            if hasattr(self, 'loader_thread') and self.loader_thread.isRunning():
-                # 先停止當前線程
-                try:
-                    self.loader_thread.stop()
-                    self.loader_thread.wait(200)  # 給予足夠時間讓線程停止
-                    
-                    # 如果線程仍在運行且無法停止，則強制終止
-                    if self.loader_thread.isRunning():
-                        logger.warning("載入線程無法停止，強制終止")
-                        self.loader_thread.terminate()
-                except Exception as e:
-                    logger.error(f"停止載入線程出錯: {e}")
-                    
-            # 啟動新的線程
+                else:
+                    # 顯示特定標籤
+                    if self.current_view_index <= len(self.all_labels):
+                        label = self.all_labels[self.current_view_index - 1]
+                        self.index_label.setText(f"目前檢視: {label}")
+                        self.display_specific_label(label)
+                    elif self.current_view_index <= len(self.all_labels) + len(self.special_labels):
+                        # 特殊標籤索引
+                        special_idx = self.current_view_index - len(self.all_labels) - 1
+                        label = self.special_labels[special_idx]
+                        self.index_label.setText(f"目前檢視: {label}")
+                        self.display_specific_label(label)
+                    else:
+                        # 索引超出範圍，重置
+                        self.current_view_index = 0
+                        self.index_label.setText("目前檢視: 全部標籤")
+                        self.display_all_labels()
+            finally:
+                self.grid_widget.setUpdatesEnabled(True)
+
+            # 為目前視口內的格子建立縮略圖
+            self._materialize_visible()
+
+            # 記錄網格當前呈現的視圖，供下次略過不必要的重建
+            self._built_view_index = self.current_view_index
+            self._built_view_dirty = False
+
+            # 啟動新的載入線程（舊線程由 start_image_loader 協作式退役）
             self.start_image_loader()
             
             # 恢復滾動條位置
@@ -452,34 +467,43 @@ class OverviewWindow(QMainWindow):
     
     def clear_grid(self):
         """清空網格佈局"""
-        # 處理事件，確保界面響應
-        from PyQt5.QtWidgets import QApplication
-        
-        # 使用取出計數來分批處理
-        count = 0
-        while self.grid_layout.count():
-            item = self.grid_layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.setParent(None)
-                
-            # 每清除10個項目處理一次事件
-            count += 1
-            if count % 10 == 0:
-                QApplication.processEvents()
-        
+        # 網格即將清空，目前呈現的視圖不再有效
+        self._built_view_index = None
+        self._pending_cells.clear()
+
+        # 拆除期間同樣關閉重繪：每個 takeAt/setParent 都會使版面
+        # 失效，逐個重排只是把同一筆帳付上數百次
+        self.grid_widget.setUpdatesEnabled(False)
+        try:
+            # 歸零預留的列高欄寬，避免舊視圖的空間殘留在新視圖
+            for r in range(self.grid_layout.rowCount()):
+                self.grid_layout.setRowMinimumHeight(r, 0)
+            for c in range(self.grid_layout.columnCount()):
+                self.grid_layout.setColumnMinimumWidth(c, 0)
+
+            while self.grid_layout.count():
+                item = self.grid_layout.takeAt(0)
+                widget = item.widget()
+                if widget is None:
+                    continue
+                if isinstance(widget, ThumbnailWidget):
+                    # 縮略圖留在池中只隱藏，下次視圖直接掛回，
+                    # 免付重新 parent 與樣式重算的成本
+                    widget.hide()
+                else:
+                    # 標題與占位標籤每次重建都會重新產生，直接丟棄
+                    widget.setParent(None)
+        finally:
+            self.grid_widget.setUpdatesEnabled(True)
+
         # 重置縮略圖小部件緩存，僅保留已建立的小部件
-        self.thumbnail_widgets = {path: widget for path, widget in self.thumbnail_widgets.items() 
+        self.thumbnail_widgets = {path: widget for path, widget in self.thumbnail_widgets.items()
                                 if widget is not None}
-        
+
         logger.debug("網格已清空")
     
     def display_all_labels(self):
         """顯示所有標籤的縮略圖，確保每列連續顯示，不留空白"""
-        # 處理事件，確保界面響應
-        from PyQt5.QtWidgets import QApplication
-        QApplication.processEvents()
-        
         # 顯示所有標籤，每個標籤一列
         visible_labels = self.all_labels
         
@@ -495,11 +519,7 @@ class OverviewWindow(QMainWindow):
             header.setAlignment(Qt.AlignCenter)
             header.setStyleSheet("font-weight: bold; font-size: 14px; background-color: #f0f0f0;")
             self.grid_layout.addWidget(header, 0, col)
-            
-            # 每添加5個標籤處理一次事件
-            if (col + 1) % 5 == 0:
-                QApplication.processEvents()
-        
+
         # 為每列圖片設置單獨的行計數器，確保圖片連續顯示
         row_counters = {label: 1 for label in visible_labels}  # 從1開始，因為第0行是標題
         
@@ -508,8 +528,9 @@ class OverviewWindow(QMainWindow):
         max_thumbnails_per_label = 20  # 每個標籤最多顯示20張圖片
         
         for col, label in enumerate(visible_labels):
-            label_imgs = self.label_images[label]
-            
+            # 集合轉成排序列表，顯示順序保持穩定
+            label_imgs = sorted(self.label_images[label])
+
             # 限制每個標籤顯示的圖片數量
             if len(label_imgs) > max_thumbnails_per_label:
                 # 如果圖片太多，取最前面的部分
@@ -521,29 +542,22 @@ class OverviewWindow(QMainWindow):
             if display_imgs:  # 確保這個標籤有圖片
                 # 連續顯示該標籤的所有圖片，從row=1開始（標題下方）
                 for i, img_path in enumerate(display_imgs):
-                    self.add_thumbnail(img_path, row_counters[label], col)
+                    self._queue_thumbnail(img_path, row_counters[label], col)
                     row_counters[label] += 1  # 遞增該列的行計數器
                     
                     # 計算已添加的縮略圖總數
                     total_thumbnails += 1
-                    
-                    # 每添加20個縮略圖處理一次事件，保持界面響應
-                    if total_thumbnails % 20 == 0:
-                        QApplication.processEvents()
-                        
-                        # 如果已處理了足夠多的縮略圖，顯示提示並退出循環
-                        if total_thumbnails >= 200:  # 限制總數，防止過多圖片導致卡頓
-                            logger.warning(f"縮略圖過多，顯示前 {total_thumbnails} 張")
-                            break
+
+                    # 如果已處理了足夠多的縮略圖，顯示提示並退出循環
+                    if total_thumbnails >= 200:  # 限制總數，防止過多圖片導致卡頓
+                        logger.warning(f"縮略圖過多，顯示前 {total_thumbnails} 張")
+                        break
             else:
                 # 如果沒有圖片，添加一個空標籤避免佈局問題
                 empty_label = QLabel("無圖片")
                 empty_label.setAlignment(Qt.AlignCenter)
                 self.grid_layout.addWidget(empty_label, 1, col)
-            
-            # 處理事件，確保界面響應
-            QApplication.processEvents()
-            
+
             # 提前退出循環，避免處理過多標籤
             if total_thumbnails >= 200:
                 break
@@ -556,10 +570,6 @@ class OverviewWindow(QMainWindow):
     
     def display_specific_label(self, label):
         """顯示特定標籤的縮略圖"""
-        # 處理事件，確保界面響應
-        from PyQt5.QtWidgets import QApplication
-        QApplication.processEvents()
-        
         # 添加標籤標題
         header = QLabel(f"{label} ({self.label_counts[label]})")
         header.setAlignment(Qt.AlignCenter)
@@ -567,39 +577,11 @@ class OverviewWindow(QMainWindow):
         self.grid_layout.addWidget(header, 0, 0, 1, 10)  # 標題橫跨10列
         
         # 顯示該標籤下的所有圖片，以10張一行的方式排列
-        label_imgs = self.label_images[label]
-        
-        # 如果是特殊標籤，確保數據是最新的
-        if label in ["NOT IN WHITELIST", "WHITELIST"]:
-            # 清空當前標籤的圖片列表
-            self.label_images[label] = []
-            
-            # 重新計算符合條件的圖片
-            for path, labels_list in self.data['dataset'].items():
-                if not labels_list:
-                    continue
-                
-                if label == "WHITELIST" and any(l in WHITE_LIST for l in labels_list):
-                    self.label_images[label].append(path)
-                elif label == "NOT IN WHITELIST" and labels_list:
-                    no_whitelist = True
-                    for l in labels_list:
-                        if l in WHITE_LIST:
-                            no_whitelist = False
-                            break
-                    if no_whitelist:
-                        self.label_images[label].append(path)
-            
-            # 更新數量
-            self.label_counts[label] = len(self.label_images[label])
-            # 更新標題顯示
-            header.setText(f"{label} ({self.label_counts[label]})")
-            # 更新圖片列表
-            label_imgs = self.label_images[label]
-            
-            # 處理事件，確保界面響應
-            QApplication.processEvents()
-        
+        # （集合轉成排序列表，顯示順序保持穩定）。
+        # 特殊標籤桶由 _classify_path 在全量重建與單張更新時同步維護，
+        # 這裡不再整個資料集重掃一次
+        label_imgs = sorted(self.label_images[label])
+
         # 限制顯示的圖片數量，避免過多圖片導致卡頓
         if len(label_imgs) > MAX_IMAGES:
             logger.warning(f"標籤 {label} 有 {len(label_imgs)} 張圖片，僅顯示前 {MAX_IMAGES} 張")
@@ -609,11 +591,7 @@ class OverviewWindow(QMainWindow):
             for i, img_path in enumerate(label_imgs):
                 row = (i // 10) + 1  # 每行10張，第一行是標題
                 col = i % 10
-                self.add_thumbnail(img_path, row, col)
-                
-                # 每添加20張圖片處理一次事件，保持界面響應
-                if (i + 1) % 20 == 0:
-                    QApplication.processEvents()
+                self._queue_thumbnail(img_path, row, col)
         else:
             # 沒有圖片時顯示提示
             empty_label = QLabel("此類別無圖片")
@@ -622,6 +600,51 @@ class OverviewWindow(QMainWindow):
         
         logger.debug(f"顯示特定標籤模式: {label}, {len(label_imgs)} 張圖片")
     
+    # 每個縮略圖格子的概略高度（180px 小部件 + 5px 間距）
+    _CELL_HEIGHT = 185
+
+    def _queue_thumbnail(self, img_path, row, col):
+        """登記縮略圖格子但先不建立小部件
+
+        小部件已存在（之前的視圖建過）時直接掛回網格；
+        否則只記下位置並預留列高，等格子捲進視口再建立，
+        常駐小部件數量從 O(資料集) 降到 O(看過的格子)。
+        """
+        if img_path in self.thumbnail_widgets and self.thumbnail_widgets[img_path] is not None:
+            self.add_thumbnail(img_path, row, col)
+            return
+        self._pending_cells[(row, col)] = img_path
+        # 預留格子尺寸，捲動範圍在小部件建立前就正確
+        self.grid_layout.setRowMinimumHeight(row, 180)
+        self.grid_layout.setColumnMinimumWidth(col, 160)
+
+    def resizeEvent(self, event):
+        """視窗尺寸變化時補建新露出的格子
+
+        放大視窗（如最大化）會讓緩衝帶外的列直接露出來，而內容
+        不再需要捲軸時 valueChanged 根本不會觸發，只靠捲動信號
+        會留下永遠空白的預留格。
+        """
+        super().resizeEvent(event)
+        if hasattr(self, '_pending_cells'):
+            self._materialize_visible()
+
+    def _materialize_visible(self, _value=None):
+        """為視口（含上下各一個畫面的緩衝）內的待建格子建立縮略圖"""
+        if not self._pending_cells:
+            return
+        viewport_h = self.scroll_area.viewport().height()
+        y0 = self.scroll_area.verticalScrollBar().value() - viewport_h
+        y1 = y0 + 3 * viewport_h
+
+        due = [cell for cell in self._pending_cells
+               if y0 <= cell[0] * self._CELL_HEIGHT <= y1]
+        for cell in due:
+            img_path = self._pending_cells.pop(cell)
+            self.add_thumbnail(img_path, cell[0], cell[1])
+        if due:
+            logger.debug(f"視口內建立 {len(due)} 個縮略圖，剩餘 {len(self._pending_cells)} 個待建")
+
     def add_thumbnail(self, img_path, row, col):
         """添加縮略圖到網格"""
         try:
@@ -642,12 +665,8 @@ class OverviewWindow(QMainWindow):
                 img_labels = self.data['dataset'].get(img_path, [])
                 thumbnail.set_labels(img_labels)
                 
-                # 如果圖片已在緩存中，設置圖片
-                if img_path in self.image_cache:
-                    try:
-                        thumbnail.set_image(self.image_cache[img_path])
-                    except Exception as e:
-                        logger.error(f"從緩存設置圖片時出錯: {e}")
+                # 如果縮圖已在應用級快取中，直接取用
+                thumbnail.load_from_cache()
             
             # 設置目標類別
             target_class = None
@@ -656,70 +675,104 @@ class OverviewWindow(QMainWindow):
                     target_class = self.all_labels[self.current_view_index - 1]
             thumbnail.set_target_class(target_class)
             
-            # 添加到網格
+            # 添加到網格（池中的小部件在 clear_grid 時被隱藏）
             if row >= 0 and col >= 0:
                 self.grid_layout.addWidget(thumbnail, row, col)
+                thumbnail.show()
         except Exception as e:
             logger.error(f"添加縮略圖時發生錯誤: {e}")
     
     def update_thumbnail_label(self, img_path, new_labels):
         """更新縮略圖的標籤"""
-        # 更新內存數據
+        # 更新內存數據（內部統一以 set 儲存標籤）
         if img_path in self.data['dataset']:
-            self.data['dataset'][img_path] = new_labels
-        
-        # 更新縮略圖顯示
+            self.data['dataset'][img_path] = set(new_labels)
+        
+        # 重新分類一律執行：懶實體化下路徑可能還沒有小部件，
+        # 索引與髒旗標不能跟著小部件一起缺席，否則之後的視圖
+        # 切換會拿到過期的分類
+        self._update_label_classifications(img_path, new_labels)
+        # 分類變了，下一次切換視圖時需要重建網格
+        self._built_view_dirty = True
+
+        # 更新計數
+        self.label_counts = {label: len(imgs) for label, imgs in self.label_images.items()}
+
+        # 更新縮略圖顯示（只有這部分需要小部件存在）
         if img_path in self.thumbnail_widgets and self.thumbnail_widgets[img_path] is not None:
             thumbnail = self.thumbnail_widgets[img_path]
             thumbnail.set_labels(new_labels)
-            
+
             # 更新目標類別
             target_class = None
             if self.current_view_index > 0:
                 if self.current_view_index <= len(self.all_labels):
                     target_class = self.all_labels[self.current_view_index - 1]
             thumbnail.set_target_class(target_class)
-            
+
             logger.debug(f"更新縮略圖標籤: {img_path} -> {new_labels}")
-            
-            # 智能更新標籤分類
-            self._update_label_classifications(img_path, new_labels)
-            
-            # 更新計數
-            self.label_counts = {label: len(imgs) for label, imgs in self.label_images.items()}
-            
-            # 不再立即從視圖中移除縮略圖，即使目標類別改變
-            # 將在下一次刷新時處理視圖更新
-            
-            # 更新標題顯示的計數
-            self._update_header_counts()
+
+        # 不再立即從視圖中移除縮略圖，即使目標類別改變
+        # 將在下一次刷新時處理視圖更新
+
+        # 更新標題顯示的計數
+        self._update_header_counts()
     
+    def _rebuild_label_index(self):
+        """單趟重建 標籤 -> 路徑集合 的反向索引並更新計數
+
+        未標記圖片改用 dict 成員檢查判斷，不再為了做集合差
+        另外建兩個完整路徑集合；標籤歸屬檢查也改查 set，
+        避免對排序列表做線性掃描。
+        """
+        self.label_images = {label: set() for label in self.all_labels}
+        for label in self.special_labels:
+            self.label_images[label] = set()
+
+        dataset = self.data['dataset']
+
+        # 尚未在數據集中的圖片視為未標記
+        for path in self.all_image_paths:
+            if path not in dataset:
+                self.label_images["None"].add(path)
+
+        for path, labels_list in dataset.items():
+            self._classify_path(path, labels_list)
+
+        # 計數直接取集合大小；索引之後增量更新時會同步重算
+        self.label_counts = {label: len(imgs)
+                             for label, imgs in self.label_images.items()}
+
+    def _classify_path(self, path, labels_list):
+        """將單一路徑歸入各標籤桶與白名單特殊分類
+
+        單趟走過標籤列表，邊建索引邊判斷白名單歸屬；
+        全量重建與單張增量更新共用這份邏輯，避免多份副本各自演化。
+        """
+        li = self.label_images
+        if not labels_list:
+            li["None"].add(path)
+            return
+
+        known_labels = self._all_labels_set
+        for label in labels_list:
+            if label in known_labels:
+                li[label].add(path)
+
+        if _WL.isdisjoint(labels_list):
+            li["NOT IN WHITELIST"].add(path)
+        else:
+            li["WHITELIST"].add(path)
+
     def _update_label_classifications(self, img_path, new_labels):
         """更新圖片的標籤分類"""
-        # 先從所有標籤分類中移除此圖片
+        # 先從所有標籤分類中移除此圖片（集合 discard 為 O(1)，
+        # 不必逐列表線性掃描）
         for label_imgs in self.label_images.values():
-            if img_path in label_imgs:
-                label_imgs.remove(img_path)
-        
-        # 根據新標籤重新分類
-        if not new_labels:
-            self.label_images["None"].append(img_path)
-        else:
-            for label in new_labels:
-                if label in self.all_labels:
-                    self.label_images[label].append(img_path)
-            
-            # 處理白名單特殊分類
-            if any(label in WHITE_LIST for label in new_labels):
-                self.label_images["WHITELIST"].append(img_path)
-            elif new_labels:  # 確保有標籤且都不在白名單中
-                no_whitelist = True
-                for label in new_labels:
-                    if label in WHITE_LIST:
-                        no_whitelist = False
-                        break
-                if no_whitelist:
-                    self.label_images["NOT IN WHITELIST"].append(img_path)
+            label_imgs.discard(img_path)
+
+        # 根據新標籤重新分類，與全量重建走同一份邏輯
+        self._classify_path(img_path, new_labels)
     
     def _update_header_counts(self):
         """更新標題顯示的標籤計數"""
@@ -752,46 +805,10 @@ class OverviewWindow(QMainWindow):
         scroll_position = self.scroll_area.verticalScrollBar().value()
         logger.debug(f"保存滾動條位置: {scroll_position}")
         
-        # 重新計算標籤分類
-        self.label_images = {label: [] for label in self.all_labels}
-        # 重置特殊標籤的圖片列表
-        for label in self.special_labels:
-            self.label_images[label] = []
-        
-        # 查找所有圖片路徑，包括尚未在數據集中的圖片
-        all_image_paths_set = set(self.all_image_paths)
-        dataset_paths_set = set(self.data['dataset'].keys())
-        
-        # 處理尚未在數據集中的圖片
-        unlabeled_paths = all_image_paths_set - dataset_paths_set
-        for path in unlabeled_paths:
-            self.label_images["None"].append(path)
-        
-        # 處理已在數據集中的圖片
-        for path, labels_list in self.data['dataset'].items():
-            if not labels_list:
-                self.label_images["None"].append(path)
-            else:
-                # 處理標準標籤
-                for label in labels_list:
-                    if label in self.all_labels:
-                        self.label_images[label].append(path)
-                
-                # 處理白名單特殊分類
-                if any(label in WHITE_LIST for label in labels_list):
-                    self.label_images["WHITELIST"].append(path)
-                elif labels_list:  # 確保有標籤且都不在白名單中
-                    no_whitelist = True
-                    for label in labels_list:
-                        if label in WHITE_LIST:
-                            no_whitelist = False
-                            break
-                    if no_whitelist:
-                        self.label_images["NOT IN WHITELIST"].append(path)
-        
-        # 更新標籤數量
-        self.label_counts = {label: len(imgs) for label, imgs in self.label_images.items()}
-        
+        # 重新計算標籤分類（標籤 -> 路徑集合）
+        self._built_view_dirty = True
+        self._rebuild_label_index()
+
         # 更新視圖
         self.update_view()
         
@@ -810,24 +827,13 @@ class OverviewWindow(QMainWindow):
     
     def closeEvent(self, event):
         """視窗關閉事件"""
-        # 停止圖片載入線程
-        if hasattr(self, 'loader_thread') and self.loader_thread.isRunning():
-            logger.debug("關閉視窗，停止載入線程")
-            try:
-                self.loader_thread.stop()
-                self.loader_thread.wait(500)  # 給足足夠的時間停止
-                
-                # 如果線程仍在運行，則強制結束
-                if self.loader_thread.isRunning():
-                    logger.warning("線程未能及時停止，強制終止")
-                    self.loader_thread.terminate()
-                    self.loader_thread.wait()
-            except Exception as e:
-                logger.error(f"停止載入線程時出錯: {e}")
-        
-        # 釋放資源
-        self.image_cache.clear()
-        self.thumbnail_widgets.clear()
+        # 停止圖片載入線程（協作式退役，視窗關閉不被擋住）
+        logger.debug("關閉視窗，停止載入線程")
+        self._retire_loader()
+        
+        # 池中的縮略圖保留：它們仍是 grid_widget 的子部件，清掉字典
+        # 只會讓舊部件變成摸不到的殭屍，單例視窗重開時照常重用即可
+        # （縮圖像素同樣留在 QPixmapCache，由 Qt 依上限淘汰）
         
         event.accept()
         logger.debug("總覽視窗已關閉") 
\ No newline at end of file